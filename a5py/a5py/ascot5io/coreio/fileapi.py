@@ -68,6 +68,14 @@ OUTPUTGROUPS = ["inistate", "endstate", "dist5d", "distrho5d", "dist6d",
 VERSION = "5.5"
 """Current version of the code."""
 
+CHUNKCACHE = {"rdcc_nbytes":256*1024**2, "rdcc_nslots":1000003, "rdcc_w0":0.75}
+"""Chunk cache settings for reading large chunked (and compressed) datasets.
+
+The default cache (1 MB) cannot hold the chunks of a large dataset, which leads
+to chunks being evicted and decompressed repeatedly. The number of slots should
+be a prime number that is much larger than the number of cached chunks.
+"""
+
 def set_active(f, group):
     """Set given group as active.
 
@@ -631,7 +639,9 @@ def copy_group(fs, ft, group, newgroup=False):
     """Copy group from one file to another. A parent is also created if need be.
 
     The new group is set as active if the parent on the target file has no other
-    groups. The copied group retains its original QID and date of creation.
+    groups. The copied group retains its original QID and date of creation
+    unless ``newgroup`` is set, in which case the group can also be copied
+    within the same file.
 
     Parameters
     ----------
@@ -669,7 +679,7 @@ def copy_group(fs, ft, group, newgroup=False):
     parentname = group.parent.name
 
     newparent  = ft.require_group(parentname)
-    if group.name in newparent:
+    if not newgroup and group.name in newparent:
         raise AscotIOException("Target already has the group " + group.name)
 
     # Copy
@@ -734,13 +744,20 @@ def read_data(group, name):
 
         If dataset has no "unit" attribute, ordinary `np.array` is returned.
     """
-    if "unit" in group[name].attrs.keys():
-        unit_str = group[name].attrs["unit"]
+    # Read directly to a preallocated buffer which bypasses the selection
+    # machinery of h5py that the slicing syntax would use.
+    dset = group[name]
+    data = np.empty(dset.shape, dtype=dset.dtype)
+    if data.size > 0:
+        dset.read_direct(data)
+
+    if "unit" in dset.attrs.keys():
+        unit_str = dset.attrs["unit"]
         unit     = unyt.Unit(unit_str)
 
-        return group[name][:].ravel() * unit
+        return data.ravel() * unit
     else:
-        return group[name][:].ravel()
+        return data.ravel()
 
 
 
@@ -67,7 +67,7 @@ class DataContainer():
         """
         self._close()
 
-    def _open(self, mode="r"):
+    def _open(self, mode="r", **kwargs):
         """Open and return the HDF5 group corresponding to this data.
 
         Returns
@@ -76,6 +76,9 @@ class DataContainer():
             HDF5 group corresponding to this data.
         mode : {"r", "a"}
             Is the file opened for (r)eading or (a)ppending.
+        **kwargs
+            Additional arguments passed to :class:`h5py.File` e.g. chunk cache
+            settings.
 
         Raises
         ------
@@ -87,7 +90,7 @@ class DataContainer():
                 "File already opened by this instance")
 
         fn = self._root._ascot.file_getpath()
-        self._opened[0] = h5py.File(fn, mode)[self._path]
+        self._opened[0] = h5py.File(fn, mode, **kwargs)[self._path]
         return self._opened[0]
 
     def _close(self):
@@ -6,9 +6,16 @@ to zero everywhere. The easiest and most computationally effective way to
 accomplish this is to use E_TC input.
 """
 import h5py
+import warnings
 import numpy as np
 
-from .coreio.fileapi import add_group
+try:
+    # Registers the Blosc2 filter so that such compressed data can be read
+    import hdf5plugin
+except ImportError:
+    hdf5plugin = None
+
+from .coreio.fileapi import add_group, CHUNKCACHE
 from .coreio.treedata import DataGroup
 
 class E_TC(DataGroup):
@@ -121,18 +128,20 @@ class E_3D(DataGroup):
         path = self._path
 
         out = {}
-        with h5py.File(fn,"r") as f:
+        with h5py.File(fn, "r", **CHUNKCACHE) as f:
             for key in f[path]:
                 out[key] = f[path][key][:]
 
-        out["er"]   = np.transpose(out["er"],   (2,1,0))
-        out["ephi"] = np.transpose(out["ephi"], (2,1,0))
-        out["ez"]   = np.transpose(out["ez"],   (2,1,0))
+            # Older files store the components in (z, phi, R) order
+            if f[path]["er"].attrs.get("axis_order") != "R,phi,z":
+                out["er"]   = np.transpose(out["er"],   (2,1,0))
+                out["ephi"] = np.transpose(out["ephi"], (2,1,0))
+                out["ez"]   = np.transpose(out["ez"],   (2,1,0))
         return out
 
     @staticmethod
     def write_hdf5(fn, rmin, rmax, nr, zmin, zmax, nz, phimin, phimax, nphi,
-                   er, ephi, ez, desc=None):
+                   er, ephi, ez, desc=None, compression="gzip"):
         """Write input data to the HDF5 file.
 
         The toroidal angle phi is treated as a periodic coordinate, meaning
@@ -140,6 +149,10 @@ class E_3D(DataGroup):
         arrays are tabulated, is ``linspace(phimin, phimax, nphi+1)[:-1]``
         to avoid storing duplicate data.
 
+        The field components can be compressed with Blosc2 which decompresses
+        much faster than gzip. Reading such data requires ``hdf5plugin`` to be
+        installed, so gzip is used by default.
+
         Parameters
         ----------
         fn : str
@@ -170,6 +183,10 @@ class E_3D(DataGroup):
             Electric field z component [V/m].
         desc : str, optional
             Input description.
+        compression : {"gzip", "blosc2"}, optional
+            Compression filter for the field components.
+
+            If ``hdf5plugin`` is not available, "blosc2" falls back to "gzip".
 
         Returns
         -------
@@ -181,6 +198,18 @@ class E_3D(DataGroup):
         ValueError
             If inputs were not consistent.
         """
+        if compression not in ["gzip", "blosc2"]:
+            raise ValueError("Unknown compression: " + str(compression))
+        if compression == "blosc2" and hdf5plugin is None:
+            warnings.warn("Could not import hdf5plugin. Using gzip instead.")
+            compression = "gzip"
+        if compression == "blosc2":
+            filters = hdf5plugin.Blosc2(cname="zstd", clevel=3,
+                                        filters=hdf5plugin.Blosc2.BITSHUFFLE)
+        else:
+            filters = {"compression":"gzip", "compression_opts":4,
+                       "shuffle":True}
+
         if er.shape   != (nr,nphi,nz):
             raise ValueError("ER has an inconsinstent shape.")
         if ephi.shape != (nr,nphi,nz):
@@ -192,10 +221,6 @@ class E_3D(DataGroup):
         group  = "E_3D"
         gname  = ""
 
-        er   = np.transpose(er,(2,1,0))
-        ephi = np.transpose(ephi,(2,1,0))
-        ez   = np.transpose(ez,(2,1,0))
-
         # Create a group for this input.
         with h5py.File(fn, "a") as f:
             g = add_group(f, parent, group, desc=desc)
@@ -210,9 +235,16 @@ class E_3D(DataGroup):
             g.create_dataset("zmin",          (1,),  data=zmin,   dtype="f8")
             g.create_dataset("zmax",          (1,),  data=zmax,   dtype="f8")
             g.create_dataset("nz",            (1,),  data=nz,     dtype="i4")
-            g.create_dataset("er",  (nz, nphi, nr),  data=er,     dtype="f8")
-            g.create_dataset("ephi",(nz, nphi, nr),  data=ephi,   dtype="f8")
-            g.create_dataset("ez",  (nz, nphi, nr),  data=ez,     dtype="f8")
+
+            # The field components are stored chunked (~1 MB per chunk) and
+            # compressed so that partial reads touch only the relevant chunks.
+            # Data is written in the caller's (R, phi, z) layout as is and the
+            # order is recorded in an attribute.
+            chunks = (min(nr, 64), min(nphi, 32), min(nz, 64))
+            for name, data in [("er", er), ("ephi", ephi), ("ez", ez)]:
+                d = g.create_dataset(name, (nr, nphi, nz), data=data,
+                                     dtype="f8", chunks=chunks, **filters)
+                d.attrs["axis_order"] = "R,phi,z"
 
         return gname
 
@@ -562,6 +594,8 @@ class E_1DS(DataGroup):
                 if key == "nrho":
                     out[key] = int(out[key])
 
+        # Older files stored dvdrho as (nrho,1)
+        out["dvdrho"] = out["dvdrho"].ravel()
         return out
 
     @staticmethod
@@ -578,7 +612,7 @@ class E_1DS(DataGroup):
             Minimum rho value.
         rhomax : float
             Maximum rho value.
-        dvdrho : array_like (nrho,1)
+        dvdrho : array_like (nrho,)
             Derivative of electric potential with respect to minor radius [V/m].
 
             If ``reff = 1 m``, this is essentially equal to ``dv/dr``.
@@ -611,7 +645,8 @@ class E_1DS(DataGroup):
             g.create_dataset('nrho',   (1,1),     data=nrho,   dtype='i8')
             g.create_dataset('rhomin', (1,1),     data=rhomin, dtype='f8')
             g.create_dataset('rhomax', (1,1),     data=rhomax, dtype='f8')
-            g.create_dataset('dvdrho', (nrho,1),  data=dvdrho, dtype='f8')
+            g.create_dataset('dvdrho', (nrho,),
+                             data=np.asarray(dvdrho).reshape(nrho), dtype='f8')
             g.create_dataset('reff',   (1,1),     data=reff,   dtype='f8')
 
         return gname
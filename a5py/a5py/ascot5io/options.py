@@ -1062,16 +1062,21 @@ class Opt(DataGroup):
         group  = "opt"
         gname  = ""
 
+        # Options are small so they are stored with compact layout, i.e., within
+        # the dataset header, which avoids allocating a separate raw data block
+        # for each of the parameters. Large arrays use the default layout.
+        compact = h5py.h5p.create(h5py.h5p.DATASET_CREATE)
+        compact.set_layout(h5py.h5d.COMPACT)
+
         with h5py.File(fn, "a") as f:
             g = add_group(f, parent, group, desc=desc)
             gname = g.name.split("/")[-1]
 
             # Convert all options to numpy float arrays and write
             for param, data in kwargs.items():
-                data = np.asarray(data)
-
-                data = data.astype("f8")
-                d = g.create_dataset(param, (data.size,), data=data)
+                data = np.asarray(data, dtype="f8")
+                dcpl = compact if data.nbytes < 32768 else None
+                d = g.create_dataset(param, (data.size,), data=data, dcpl=dcpl)
 
         return gname
 
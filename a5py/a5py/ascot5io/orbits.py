@@ -18,13 +18,44 @@ class Orbits(DataContainer):
     GUIDINGCENTER = 2
     FIELDLINE     = 3
 
+    def __init__(self, root, path, **kwargs):
+        """Initialize orbit container.
+
+        Parameters
+        ----------
+        root : :class:`RootNode`
+            The root node this data container belongs to.
+        path : str
+            Path to this data within the HDF5 file.
+        **kwargs
+            Arguments passed to other constructors in case of multiple
+            inheritance.
+        """
+        super().__init__(root, path, **kwargs)
+
+        # Indices that sort the data by ID and mileage. The orbit data does
+        # not change once written so these are evaluated only once.
+        self._sortidx = None
+
+    def __enter__(self):
+        """Open the orbit data with a chunk cache sized for large datasets.
+
+        Returns
+        -------
+        data : :class:`h5py.Group`
+            HDF5 group corresponding to this data.
+        """
+        return self._open(**fileapi.CHUNKCACHE)
+
     def read(self):
         """Read raw state data to a dictionary.
         """
         out = {}
         with self as f:
             for key in f:
-                out[key] = f[key][:]
+                out[key] = np.empty(f[key].shape, dtype=f[key].dtype)
+                if out[key].size > 0:
+                    f[key].read_direct(out[key])
 
         return out
 
@@ -53,37 +84,74 @@ class Orbits(DataContainer):
             The quantities as an array ordered by marker ID (major) and mileage
             (minor).
         """
-        # Prepare helper variables and functions
-        def _val(q, mask=None):
-            """Read quantity from HDF5.
-            """
-            with self as h5:
-                if q in h5:
-                    return fileapi.read_data(h5, q)
-            return None
-
-        # Sort using the fact that inistate.get return values ordered by ID
-        # and also np.unique returns indices that produce a sorted array.
-        mode    = _val("simmode")
-        _, idx  = np.unique(_val("ids").v, return_inverse=True)
-        mass    = inistate.get("mass")[0][idx]
-        time    = inistate.get("time")[0][idx]
-        connlen = inistate.get("mileage")[0][idx] - _val("mileage")
-
-        # Only field lines are constant in time
-        if not Orbits.FIELDLINE in mode: time = time + _val("mileage")
-
-        def _eval(q, mask=None):
-            """Evaluate input quantities at marker position.
-            """
-            return self._root._ascot.input_eval(
-                _val("r", mask=mask), _val("phi",  mask=mask),
-                _val("z", mask=mask), time[mask], *[q])
-
-        return Orbits._getactual(mass, time, connlen, mode, _val, _eval, *qnt)
+        # Prepare helper variables and functions. Each dataset is read only
+        # once per call since the same quantities are needed repeatedly, and
+        # the file is kept open (with a large chunk cache) for the whole call.
+        data = {}
+        with self as h5:
+            def _val(q, mask=None):
+                """Read quantity from HDF5.
+                """
+                if q not in data:
+                    data[q] = fileapi.read_data(h5, q) if q in h5 else None
+                if data[q] is None or mask is None:
+                    return data[q]
+                return data[q][mask]
+
+            # Map orbit points to markers with a sorted search using the fact
+            # that inistate.get returns values ordered by ID. This is
+            # O(n log m) and does not assume that every marker has orbit data.
+            mode    = _val("simmode")
+            iniids, inimass, initime, inimile = inistate.get(
+                "ids", "mass", "time", "mileage")
+            idx     = np.searchsorted(iniids, _val("ids").v)
+            mass    = inimass[idx]
+            time    = initime[idx]
+            connlen = inimile[idx] - _val("mileage")
+
+            # Only field lines are constant in time
+            if not Orbits.FIELDLINE in mode: time = time + _val("mileage")
+
+            def _eval(q, mask=None):
+                """Evaluate input quantities at marker position.
+                """
+                return self._root._ascot.input_eval(
+                    _val("r", mask=mask), _val("phi",  mask=mask),
+                    _val("z", mask=mask), time[mask], *[q])
+
+            if self._sortidx is None:
+                self._sortidx = Orbits._sortindices(_val("ids").v,
+                                                    _val("mileage").v)
+            return Orbits._getactual(mass, time, connlen, mode, _val, _eval,
+                                     *qnt, sortidx=self._sortidx)
 
     @staticmethod
-    def _getactual(mass, time, totmil, mode, _val, _eval, *qnt):
+    def _sortindices(ids, mileage):
+        """Return indices that sort the data first by ID and then by mileage.
+
+        The data is usually written already in this order, which is checked
+        first in O(n) time so that the sorting can be skipped.
+
+        Parameters
+        ----------
+        ids : array_like, (n,)
+            Marker ID at each orbit point.
+        mileage : array_like, (n,)
+            Mileage at each orbit point.
+
+        Returns
+        -------
+        sortidx : array_like, (n,) or slice
+            Indices that sort the data or ``slice(None)`` if the data is
+            already sorted, in which case indexing does not copy the data.
+        """
+        dids = np.diff(ids)
+        if np.all(dids >= 0) and np.all((dids > 0) | (np.diff(mileage) >= 0)):
+            return slice(None)
+        return np.lexsort((mileage, ids))
+
+    @staticmethod
+    def _getactual(mass, time, totmil, mode, _val, _eval, *qnt, sortidx=None):
         """Calculate orbit quantities using the helper functions and data.
 
         Parameters
@@ -107,6 +175,10 @@ class Orbits(DataContainer):
             ``_eval(qnt : str, mask : array_like) -> value``
         *qnt : str
             Names of the quantities.
+        sortidx : array_like, (n,) or slice, optional
+            Indices that sort the data by ID and mileage.
+
+            Evaluated here if not provided.
 
         Returns
         -------
@@ -269,11 +341,10 @@ class Orbits(DataContainer):
                 raise ValueError("Unknown quantity in " + qnt[i])
 
         # Sort first by IDs and then by mileage
-        ids  = _val("ids").v
-        mile = _val("mileage").v
-        idx  = np.lexsort((mile, ids))
+        if sortidx is None:
+            sortidx = Orbits._sortindices(_val("ids").v, _val("mileage").v)
         for i in range(len(items)):
-            items[i] = items[i][idx]
+            items[i] = items[i][sortidx]
             items[i].convert_to_base("ascot")
         return items
 
@@ -29,6 +29,25 @@ class State(DataContainer):
     _NEUTR   = 0x800
     _IONIZ   = 0x1000
 
+    def __init__(self, root, path, **kwargs):
+        """Initialize state container.
+
+        Parameters
+        ----------
+        root : :class:`RootNode`
+            The root node this data container belongs to.
+        path : str
+            Path to this data within the HDF5 file.
+        **kwargs
+            Arguments passed to other constructors in case of multiple
+            inheritance.
+        """
+        super().__init__(root, path, **kwargs)
+
+        # Unique end conditions and the inverse indices. The state data does
+        # not change once written so these are evaluated only once.
+        self._uniqueendcond = None
+
     @property
     def ABORTED(self):
         """Marker simulation terminated in an error.
@@ -60,7 +79,7 @@ class State(DataContainer):
         return State._THERM
 
     @property
-    def WALL():
+    def WALL(self):
         """Marker intersected a wall element.
         """
         return State._WALL
@@ -75,7 +94,7 @@ class State(DataContainer):
     def RHOMAX(self):
         """Maximum radial coordinate (rho) reached.
         """
-        return _RHOMAX
+        return State._RHOMAX
 
     @property
     def POLMAX(self):
@@ -411,14 +430,35 @@ class State(DataContainer):
                 pass
         return items
 
+    def endcond_unique(self):
+        """Return unique end conditions and their inverse indices.
+
+        Markers typically have only a handful of distinct end conditions so
+        checks against them are faster to do for the unique values only.
+
+        Returns
+        -------
+        uecs : array_like
+            Unique end condition bitarrays.
+        uidx : array_like
+            Indices that reconstruct the (ID-ordered) end condition array
+            from ``uecs``.
+        """
+        if self._uniqueendcond is None:
+            self._uniqueendcond = np.unique(self.get("endcond"),
+                                            return_inverse=True)
+        return self._uniqueendcond
+
     @staticmethod
     def endcond_check(bitarr, string):
         """Check if the binary end condition matches the human-readable.
 
         Parameters
         ----------
-        bitarr : :obj:`np.uint32`
+        bitarr : :obj:`np.uint32` or array_like
             Value of the end condition as it is stored in the HDF5 file.
+
+            An array of end conditions is checked element-wise.
         string : str
             Human-readable end condition (case-insensitive).
 
@@ -435,7 +475,7 @@ class State(DataContainer):
 
         Returns
         -------
-        match : bool
+        match : bool or array_like
             True if the two representations of end conditions match.
         """
         endconds = string.upper().split()
@@ -463,7 +503,8 @@ class State(DataContainer):
             else:
                 ec_yes = ec_yes | ec
 
-        return (bitarr & ec_yes) == ec_yes and (bitarr & ec_non) == 0
+        return np.logical_and((bitarr & ec_yes) == ec_yes,
+                              (bitarr & ec_non) == 0)
 
     @staticmethod
     def endcond_tostring(bitarr):
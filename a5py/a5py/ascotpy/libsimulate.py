@@ -19,6 +19,49 @@ from .libascot import _LIBASCOT
 if _LIBASCOT:
     from . import ascot2py
 
+_DEG2RAD = np.pi / 180
+"""Conversion factor from degrees to radians."""
+
+def _input_particle_array(nmrk, ptype, member, **fields):
+    """Pack marker data in an array that has the layout of C input_particle.
+
+    Parameters
+    ----------
+    nmrk : int
+        Number of markers.
+    ptype : int
+        Marker type as in ``input_particle_type`` enum.
+    member : {"p", "p_gc", "p_ml"}
+        Name of the union member in input_particle the data is stored to.
+    **fields : array_like (nmrk,)
+        Values of the fields in the union member struct.
+
+    Returns
+    -------
+    arr : array_like (nmrk,)
+        Structured array whose contents can be copied directly to
+        an ``input_particle`` array.
+    """
+    cstruct = {"p" : ascot2py.particle, "p_gc" : ascot2py.particle_gc,
+               "p_ml" : ascot2py.particle_ml}[member]
+    offset  = ascot2py.input_particle.c__SA_input_particle_0.offset
+    names   = ["type"]
+    formats = [np.dtype(ascot2py.input_particle_type)]
+    offsets = [ascot2py.input_particle.type.offset]
+    for name, ctype in cstruct._fields_:
+        names.append(name)
+        formats.append(np.dtype(ctype))
+        offsets.append(offset + getattr(cstruct, name).offset)
+    dtype = np.dtype({"names" : names, "formats" : formats,
+                      "offsets" : offsets,
+                      "itemsize" : ctypes.sizeof(ascot2py.input_particle)})
+
+    arr = np.zeros((nmrk,), dtype=dtype)
+    arr["type"] = ptype
+    for name, val in fields.items():
+        arr[name] = np.asarray(val).ravel()
+    return arr
+
 class LibSimulate():
     """Mixin class that introduces methods for active simulations.
     """
@@ -137,11 +180,11 @@ class LibSimulate():
 
         diagorb.ntoroidalplots = len(torangs)
         for i in range(diagorb.ntoroidalplots):
-            diagorb.toroidalangles[i] = torangs[i] * np.pi / 180
+            diagorb.toroidalangles[i] = torangs[i] * _DEG2RAD
 
         diagorb.npoloidalplots = len(polangs)
         for i in range(diagorb.npoloidalplots):
-            diagorb.poloidalangles[i] = polangs[i] * np.pi / 180
+            diagorb.poloidalangles[i] = polangs[i] * _DEG2RAD
 
         diagorb.nradialplots = len(radials)
         for i in range(diagorb.nradialplots):
@@ -190,69 +233,44 @@ class LibSimulate():
         self._virtualmarkers = mrk
         nmrk = mrk["n"]
         pin = ascot2py.libascot_allocate_input_particles(nmrk)
-        prttypes = ascot2py.input_particle_type__enumvalues
 
-        # particle
+        # The marker data is packed in an array that has the same memory layout
+        # as the C structs so that it can be copied with a single memmove.
+        phi = np.multiply(np.ravel(mrk["phi"]), _DEG2RAD, dtype="f8")
         if "vr" in mrk:
-            for i in range(nmrk):
-                pin[i].type = ascot2py.input_particle_type_p
-                p = pin[i].c__SA_input_particle_0.p
-
-                vvec = np.array([mrk["vr"][i], mrk["vphi"][i], mrk["vz"][i]]) * unyt.m/unyt.s
-                pvec = momentum_velocity(mrk["mass"][i], vvec)
-
-                p.r       = mrk["r"][i]
-                p.phi     = mrk["phi"][i] * np.pi / 180
-                p.z       = mrk["z"][i]
-                p.p_r     = pvec[0]
-                p.p_phi   = pvec[1]
-                p.p_z     = pvec[2]
-                p.mass    = mrk["mass"][i]
-                p.charge  = mrk["charge"][i]
-                print(mrk)
-                print(mrk["anum"])
-                print(mrk["anum"][i])
-                print(mrk["anum"][i][0])
-                p.anum    = mrk["anum"][i][0]
-                p.znum    = mrk["znum"][i]
-                p.weight  = mrk["weight"][i]
-                p.time    = mrk["time"][i]
-                p.mileage = mrk["mileage"][i]
-                p.id      = mrk["ids"][i]
-
-        # particle gc
+            # particle
+            vvec = np.array([np.ravel(mrk["vr"]), np.ravel(mrk["vphi"]),
+                             np.ravel(mrk["vz"])]) * unyt.m/unyt.s
+            pvec = np.asarray(momentum_velocity(np.ravel(mrk["mass"]), vvec))
+            arr = _input_particle_array(
+                nmrk, ascot2py.input_particle_type_p, "p",
+                r=mrk["r"], phi=phi, z=mrk["z"],
+                p_r=pvec[0,:], p_phi=pvec[1,:], p_z=pvec[2,:],
+                mass=mrk["mass"], charge=mrk["charge"], anum=mrk["anum"],
+                znum=mrk["znum"], weight=mrk["weight"], time=mrk["time"],
+                mileage=mrk["mileage"], id=mrk["ids"])
+
         elif "energy" in mrk:
-            for i in range(nmrk):
-                pin[i].type = ascot2py.input_particle_type_gc
-                p = pin[i].c__SA_input_particle_0.p_gc
-
-                p.r       = mrk["r"][i]
-                p.phi     = mrk["phi"][i] * np.pi / 180
-                p.z       = mrk["z"][i]
-                p.energy  = mrk["energy"][i] * unyt.elementary_charge.value
-                p.pitch   = mrk["pitch"][i]
-                p.zeta    = mrk["zeta"][i]
-                p.mass    = mrk["mass"][i] * unyt.atomic_mass_unit.value
-                p.charge  = mrk["charge"][i] * unyt.elementary_charge.value
-                p.anum    = mrk["anum"][i]
-                p.znum    = mrk["znum"][i]
-                p.weight  = mrk["weight"][i]
-                p.time    = mrk["time"][i]
-                p.id      = mrk["ids"][i]
-
-        # particle fl
+            # particle gc
+            arr = _input_particle_array(
+                nmrk, ascot2py.input_particle_type_gc, "p_gc",
+                r=mrk["r"], phi=phi, z=mrk["z"],
+                energy=np.ravel(mrk["energy"]) * unyt.elementary_charge.value,
+                pitch=mrk["pitch"], zeta=mrk["zeta"],
+                mass=np.ravel(mrk["mass"]) * unyt.atomic_mass_unit.value,
+                charge=np.ravel(mrk["charge"]) * unyt.elementary_charge.value,
+                anum=mrk["anum"], znum=mrk["znum"], weight=mrk["weight"],
+                time=mrk["time"], id=mrk["ids"])
+
         else:
-            for i in range(nmrk):
-                pin[i].type = ascot2py.input_particle_type_ml
-                p = pin[i].c__SA_input_particle_0.p_ml
-
-                p.r       = mrk["r"][i]
-                p.phi     = mrk["phi"][i] * np.pi / 180
-                p.z       = mrk["z"][i]
-                p.pitch   = mrk["pitch"][i]
-                p.weight  = mrk["weight"][i]
-                p.time    = mrk["time"][i]
-                p.id      = mrk["ids"][i]
+            # particle fl
+            arr = _input_particle_array(
+                nmrk, ascot2py.input_particle_type_ml, "p_ml",
+                r=mrk["r"], phi=phi, z=mrk["z"],
+                pitch=mrk["pitch"], weight=mrk["weight"], time=mrk["time"],
+                id=mrk["ids"])
+
+        ctypes.memmove(pin, arr.ctypes.data, arr.nbytes)
 
         ascot2py.prepare_markers(
             ctypes.byref(self._sim), self._mpi_size, self._mpi_rank, nmrk,
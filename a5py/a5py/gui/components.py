@@ -250,11 +250,25 @@ class PlotFrame(tkinter.Frame):
         self.figcanvas.draw()
 
     def clear(self):
-        if self.fig.axes:
+        """Clear the figure before a new plot.
+
+        The existing axes are cleared and reused instead of creating new ones
+        on every replot. New axes are created when switching to or from 3D
+        axes, or when the figure contains additional axes, e.g. colorbars,
+        since those have taken space from the axes they are attached to.
+        """
+        axes = self.axes if isinstance(self.axes, list) else [self.axes]
+        if getattr(self, "axes3d", False) or \
+           any(ax.name == "3d" for ax in axes) or \
+           any(ax not in axes for ax in self.fig.axes):
             for ax in self.fig.axes:
                 self.fig.delaxes(ax)
+            self.axes = self.set_axes()
+            return
 
-        self.axes = self.set_axes()
+        for ax in axes:
+            ax.clear()
+            ax.set_axes_locator(None)
 
     def set_axes(self):
         return self.fig.add_subplot(1,1,1)
@@ -13,9 +13,13 @@ all following examples give alpha particle mass in kilograms (6.64e-27 kg):
 In the last example the function deduces that 4 cannot be an elementary particle
 mass and assumes it is in atomic mass units which makes more sense.
 
+Numerical input can also be given as an array in which case the conversion is
+done element-wise in a single vectorized operation.
+
 File: interpret.py
 """
 
+import numpy as np
 from scipy.constants import physical_constants as const
 
 kilogramlim = 1e-10
@@ -28,7 +32,7 @@ def mass_kg(m):
     Convert mass to kilograms.
 
     Args:
-        m : str, float <br>
+        m : str, float, array_like <br>
             Mass
     Returns:
         Mass in kilograms.
@@ -63,6 +67,11 @@ def mass_kg(m):
         elif "yo mama":
             return 1.989e30
 
+    elif np.ndim(m) > 0:
+        m = np.asarray(m, dtype=float)
+        return np.where(m > kilogramlim,
+                        m * const["atomic mass constant"][0], m)
+
     else:
         if m > kilogramlim:
             return m * const["atomic mass constant"][0]
@@ -74,7 +83,7 @@ def mass_amu(m):
     Convert mass to atomic mass units.
 
     Args:
-        m : str, float <br>
+        m : str, float, array_like <br>
             Mass
     Returns:
         Mass in atomic mass units.
@@ -86,11 +95,15 @@ def energy_J(E):
     Convert energy to Joules.
 
     Args:
-        E : str, float <br>
+        E : float, array_like <br>
             Energy
     Returns:
         Energy in Joules.
     """
+    if np.ndim(E) > 0:
+        E = np.asarray(E, dtype=float)
+        return np.where(E > Joulelim, E * const["elementary charge"][0], E)
+
     if E > Joulelim:
         return E * const["elementary charge"][0]
     else:
@@ -101,7 +114,7 @@ def energy_eV(E):
     Convert energy to electronvolts.
 
     Args:
-        E : str, float <br>
+        E : float, array_like <br>
             Energy
     Returns:
         Energy in electronvolts.
@@ -113,7 +126,7 @@ def charge_C(q):
     Convert charge to Coulombs.
 
     Args:
-        q : str, float <br>
+        q : str, float, array_like <br>
             charge
     Returns:
         Charge in Coulombs.
@@ -123,6 +136,11 @@ def charge_C(q):
         if "elementary" in q:
             return const["elementary charge"][0]
 
+    elif np.ndim(q) > 0:
+        q = np.asarray(q, dtype=float)
+        return np.where(q > Coulomblim,
+                        q * const["elementary charge"][0], q)
+
     else:
         if q > Coulomblim:
             return q * const["elementary charge"][0]
@@ -134,7 +152,7 @@ def charge_e(q):
     Convert charge to multiplies of elementary charge.
 
     Args:
-        q : str, float <br>
+        q : str, float, array_like <br>
             Charge
     Returns:
         Charge in multiplies of elementary charge.
@@ -18,45 +18,59 @@ def psi(x,y,i):
     """
     Evaluate basis functions Eqs. (8) and (27).
     """
-    return {
-        0 : 1.0,
-        1 : p(x,2),
-        2 : p(x,2)*log(x) - p(y,2),
-        3 : p(x,4) - 4*p(x,2)*p(y,2),
-        4 : 3.0  * p(x,4.0) * log(x)
+    return _psi(x,y)[i]
+
+
+def _psi(x,y):
+    """
+    Evaluate all basis functions at once.
+    """
+    return [
+        1.0,
+        p(x,2),
+        p(x,2)*log(x) - p(y,2),
+        p(x,4) - 4*p(x,2)*p(y,2),
+        3.0  * p(x,4.0) * log(x)
           - 9.0  * p(x,2.0) * p(y,2.0)
           - 12.0 * p(x,2.0) * log(x) * p(y,2.0)
           + 2.0  * p(y,4.0),
-        5 : p(x,6) - 12*p(x,4)*p(y,2) + 8*p(x,2)*p(y,4),
-        6 : 8*p(y,6) - 140*p(x,2)*p(y,4) - 120*p(x,2)*log(x)*p(y,4)
+        p(x,6) - 12*p(x,4)*p(y,2) + 8*p(x,2)*p(y,4),
+        8*p(y,6) - 140*p(x,2)*p(y,4) - 120*p(x,2)*log(x)*p(y,4)
         + 180*p(x,4)*log(x)*p(y,2) + 75*p(x,4)*p(y,2) - 15*p(x,6)*log(x),
-        7 : y,
-        8 : y*p(x,2),
-        9 : p(y,3)-3*y*p(x,2)*log(x),
-        10: 3*y*p(x,4)-4*p(y,3)*p(x,2),
-        11: 8*p(y,5)-45*y*p(x,4)-80*p(y,3)*p(x,2)*log(x)+60*y*p(x,4)*log(x),
-        }[i]
+        y,
+        y*p(x,2),
+        p(y,3)-3*y*p(x,2)*log(x),
+        3*y*p(x,4)-4*p(y,3)*p(x,2),
+        8*p(y,5)-45*y*p(x,4)-80*p(y,3)*p(x,2)*log(x)+60*y*p(x,4)*log(x),
+        ]
 
 
 def psix(x,y,i):
     """
     Evaluate x-derivative of the basis functions.
     """
-    return {
-        0 : 0.0,
-        1 : 2*x,
-        2 : 2*x*log(x)+x,
-        3 : 4*x**3-8*x*y**2,
-        4 : 12*x**3*log(x)+3*x**3-30*x*y**2-24*x*log(x)*y**2,
-        5 : 6*x**5-48*x**3*y**2+16*x*y**4,
-        6 : -400*x*y**4-240*x*log(x)*y**4+720*x**3*log(x)*y**2
+    return _psix(x,y)[i]
+
+
+def _psix(x,y):
+    """
+    Evaluate x-derivative of all basis functions at once.
+    """
+    return [
+        0.0,
+        2*x,
+        2*x*log(x)+x,
+        4*x**3-8*x*y**2,
+        12*x**3*log(x)+3*x**3-30*x*y**2-24*x*log(x)*y**2,
+        6*x**5-48*x**3*y**2+16*x*y**4,
+        -400*x*y**4-240*x*log(x)*y**4+720*x**3*log(x)*y**2
         +480*x**3*y**2-90*x**5*log(x)-15*x**5,
-        7 : 0,
-        8 : 2*y*x,
-        9 : -6*y*x*log(x)-3*y*x,
-        10: 12*y*x**3-8*y**3*x,
-        11: -120*y*x**3-160*y**3*x*log(x)-80*y**3*x+240*y*x**3*log(x),
-        }[i]
+        0,
+        2*y*x,
+        -6*y*x*log(x)-3*y*x,
+        12*y*x**3-8*y**3*x,
+        -120*y*x**3-160*y**3*x*log(x)-80*y**3*x+240*y*x**3*log(x),
+        ]
 
 
 def psixx(x,y,i):
@@ -84,21 +98,28 @@ def psiy(x,y,i):
     """
     Evaluate y-derivative of the basis functions.
     """
-    return {
-        0 : 0,
-        1 : 0,
-        2 : -2*y,
-        3 : -8*x**2*y,
-        4 : -18*x**2*y-24*x**2*log(x)*y+8*y**3,
-        5 : -24*x**4*y+32*x**2*y**3,
-        6 : 48*y**5-560*x**2*y**3-480*x**2*log(x)*y**3+360*x**4*log(x)*y
+    return _psiy(x,y)[i]
+
+
+def _psiy(x,y):
+    """
+    Evaluate y-derivative of all basis functions at once.
+    """
+    return [
+        0,
+        0,
+        -2*y,
+        -8*x**2*y,
+        -18*x**2*y-24*x**2*log(x)*y+8*y**3,
+        -24*x**4*y+32*x**2*y**3,
+        48*y**5-560*x**2*y**3-480*x**2*log(x)*y**3+360*x**4*log(x)*y
         +150*x**4*y,
-        7 : 1,
-        8 : x**2,
-        9 : 3*y**2-3*x**2*log(x),
-        10: 3*x**4-12*y**2*x**2,
-        11: 40*y**4-45*x**4-240*y**2*x**2*log(x)+60*x**4*log(x) ,
-        }[i]
+        1,
+        x**2,
+        3*y**2-3*x**2*log(x),
+        3*x**4-12*y**2*x**2,
+        40*y**4-45*x**4-240*y**2*x**2*log(x)+60*x**4*log(x) ,
+        ]
 
 
 def psiyy(x,y,i):
@@ -126,20 +147,34 @@ def psipart(x,y,i):
     """
     This is the (first) part in Eq. (8) that the basis functions don't cover.
     """
-    return {
-        0 : 1.0/2*p(x,2)*log(x),
-        1 : 1.0/8*p(x,4),
-        }[i]
+    return _psipart(x,y)[i]
+
+
+def _psipart(x,y):
+    """
+    Evaluate both terms of the first part in Eq. (8) at once.
+    """
+    return [
+        1.0/2*p(x,2)*log(x),
+        1.0/8*p(x,4),
+        ]
 
 
 def psipartx(x,y,i):
     """
     Evaluate x-derivative of the first part in Eq. (8).
     """
-    return {
-        0 : x*log(x)+1.0/2*x,
-        1 :  1.0/2*x**3
-        }[i]
+    return _psipartx(x,y)[i]
+
+
+def _psipartx(x,y):
+    """
+    Evaluate x-derivative of both terms in Eq. (8) at once.
+    """
+    return [
+        x*log(x)+1.0/2*x,
+        1.0/2*x**3,
+        ]
 
 
 def psipartxx(x,y,i):
@@ -156,7 +191,17 @@ def psiparty(x,y,i):
     """
     Evaluate y-derivative of the first part in Eq. (8).
     """
-    return 0
+    return _psiparty(x,y)[i]
+
+
+def _psiparty(x,y):
+    """
+    Evaluate y-derivative of both terms in Eq. (8) at once.
+    """
+    return [
+        0,
+        0,
+        ]
 
 
 def psipartyy(x,y,i):
@@ -167,20 +212,22 @@ def psipartyy(x,y,i):
 
 
 def psiX(x,y,c0,c1,c2,c3,c4,c5,c6,c7,c8,c9,c10,c11,A):
-    return   c0*psix(x,y,0)     \
-        +    c1*psix(x,y,1)     \
-        +    c2*psix(x,y,2)     \
-        +    c3*psix(x,y,3)     \
-        +    c4*psix(x,y,4)     \
-        +    c5*psix(x,y,5)     \
-        +    c6*psix(x,y,6)     \
-        +    c7*psix(x,y,7)     \
-        +    c8*psix(x,y,8)     \
-        +    c9*psix(x,y,9)     \
-        +   c10*psix(x,y,10)    \
-        +   c11*psix(x,y,11)    \
-        +     A*psipartx(x,y,0) \
-        + (1-A)*psipartx(x,y,1)
+    b  = _psix(x,y)
+    bp = _psipartx(x,y)
+    return   c0*b[0]  \
+        +    c1*b[1]  \
+        +    c2*b[2]  \
+        +    c3*b[3]  \
+        +    c4*b[4]  \
+        +    c5*b[5]  \
+        +    c6*b[6]  \
+        +    c7*b[7]  \
+        +    c8*b[8]  \
+        +    c9*b[9]  \
+        +   c10*b[10] \
+        +   c11*b[11] \
+        +     A*bp[0] \
+        + (1-A)*bp[1]
 
 
 def psiXX(x,y,c0,c1,c2,c3,c4,c5,c6,c7,c8,c9,c10,c11,zeta):
@@ -195,20 +242,22 @@ def psiXX(x,y,c0,c1,c2,c3,c4,c5,c6,c7,c8,c9,c10,c11,zeta):
 
 
 def psiY(x,y,c0,c1,c2,c3,c4,c5,c6,c7,c8,c9,c10,c11,A):
-    return     c0*psiy(x,y,0)    \
-         +     c1*psiy(x,y,1)    \
-         +     c2*psiy(x,y,2)    \
-         +     c3*psiy(x,y,3)    \
-         +     c4*psiy(x,y,4)    \
-         +     c5*psiy(x,y,5)    \
-         +     c6*psiy(x,y,6)    \
-         +     c7*psiy(x,y,7)    \
-         +     c8*psiy(x,y,8)    \
-         +     c9*psiy(x,y,9)    \
-         +    c10*psiy(x,y,10)   \
-         +    c11*psiy(x,y,11)   \
-         +     A*psiparty(x,y,0) \
-         + (1-A)*psiparty(x,y,1)
+    b  = _psiy(x,y)
+    bp = _psiparty(x,y)
+    return   c0*b[0]  \
+        +    c1*b[1]  \
+        +    c2*b[2]  \
+        +    c3*b[3]  \
+        +    c4*b[4]  \
+        +    c5*b[5]  \
+        +    c6*b[6]  \
+        +    c7*b[7]  \
+        +    c8*b[8]  \
+        +    c9*b[9]  \
+        +   c10*b[10] \
+        +   c11*b[11] \
+        +     A*bp[0] \
+        + (1-A)*bp[1]
 
 
 def psiYY(x,y,c0,c1,c2,c3,c4,c5,c6,c7,c8,c9,c10,c11,zeta):
@@ -224,20 +273,22 @@ def psi0(x,y,c0,c1,c2,c3,c4,c5,c6,c7,c8,c9,c10,c11,A):
     """
     Evaluate the (total) psi function at the given position.
     """
-    return   c0*psi(x,y,0)     \
-        +    c1*psi(x,y,1)     \
-        +    c2*psi(x,y,2)     \
-        +    c3*psi(x,y,3)     \
-        +    c4*psi(x,y,4)     \
-        +    c5*psi(x,y,5)     \
-        +    c6*psi(x,y,6)     \
-        +    c7*psi(x,y,7)     \
-        +    c8*psi(x,y,8)     \
-        +    c9*psi(x,y,9)     \
-        +   c10*psi(x,y,10)    \
-        +   c11*psi(x,y,11)    \
-        +     A*psipart(x,y,0) \
-        + (1-A)*psipart(x,y,1) \
+    b  = _psi(x,y)
+    bp = _psipart(x,y)
+    return   c0*b[0]  \
+        +    c1*b[1]  \
+        +    c2*b[2]  \
+        +    c3*b[3]  \
+        +    c4*b[4]  \
+        +    c5*b[5]  \
+        +    c6*b[6]  \
+        +    c7*b[7]  \
+        +    c8*b[8]  \
+        +    c9*b[9]  \
+        +   c10*b[10] \
+        +   c11*b[11] \
+        +     A*bp[0] \
+        + (1-A)*bp[1]
 
 
 def find_axis(R0, z0, c0, c1, c2, c3, c4, c5, c6, c7, c8, c9, c10, c11, A):
@@ -95,11 +95,14 @@ def figuresinglecolumn(aspectratio=3/2):
     """
     return plt.figure(figsize=(3.504, 3.504/aspectratio))
 
-def figuredoublecolumn(aspectratio=3/2):
+def figuredoublecolumn(aspectratio=3/2, **kwargs):
     """Return figure that has a size suitable for printing in A4 double-column
     width (when the paper has a double-column format).
+
+    Keyword arguments are passed to :func:`matplotlib.pyplot.figure`, e.g.
+    ``num`` and ``clear=True`` can be used to reuse an existing figure.
     """
-    return plt.figure(figsize=(7.205, 7.205/aspectratio))
+    return plt.figure(figsize=(7.205, 7.205/aspectratio), **kwargs)
 
 def openfigureifnoaxes(projection="rectilinear"):
     """Decorator for creating and displaying a new figure if axes are not
@@ -567,6 +570,28 @@ def arrows2d():
     """
     pass
 
+def _segmentmask(x):
+    """Find which line segments are within an orbit when orbits are joined.
+
+    Parameters
+    ----------
+    x : list [array_like]
+        Coordinates of each orbit.
+
+    Returns
+    -------
+    mask : array_like
+        Boolean array that is False for those segments, between consecutive
+        points in the concatenated array, that connect two different orbits.
+    """
+    # Empty orbits contribute no points and thus no segments
+    lens = [len(xi) for xi in x if len(xi) > 0]
+    if not lens:
+        return np.zeros(0, dtype=bool)
+    mask = np.ones(sum(lens) - 1, dtype=bool)
+    mask[np.cumsum(lens)[:-1] - 1] = False
+    return mask
+
 @openfigureifnoaxes(projection=None)
 def line2d(x, y, c=None, xlog="linear", ylog="linear", clog="linear",
            xlabel=None, ylabel=None, clabel=None, bbox=None,
@@ -631,13 +656,16 @@ def line2d(x, y, c=None, xlog="linear", ylog="linear", clog="linear",
         norm = mpl.colors.SymLogNorm(linthresh=10, linscale=1.0,
                                      vmin=bbox[-2], vmax=bbox[-1], base=10)
 
-    for i in range(len(x)):
-        points = np.array([x[i], y[i]]).T.reshape(-1, 1, 2)
-        segments = np.concatenate([points[:-1], points[1:]], axis=1)
+    # Segments of all orbits are formed in one pass and plotted as a single
+    # collection. Segments connecting consecutive orbits are dropped.
+    keep, c = _segmentmask(x), np.concatenate(c)
+    points = np.array([np.concatenate(x), np.concatenate(y)]).T.reshape(
+        -1, 1, 2)
+    segments = np.concatenate([points[:-1], points[1:]], axis=1)
 
-        lc = mpl.collections.LineCollection(segments, cmap=cmap, norm=norm)
-        lc.set_array(c[i][1:])
-        line = axes.add_collection(lc)
+    lc = mpl.collections.LineCollection(segments[keep], cmap=cmap, norm=norm)
+    lc.set_array(c[1:][keep])
+    line = axes.add_collection(lc)
     smap = mpl.cm.ScalarMappable(norm=norm, cmap=cmap)
     plt.colorbar(smap, ax=axes, cax=cax)
 
@@ -715,14 +743,17 @@ def line3d(x, y, z, c=None, xlog="linear", ylog="linear", zlog="linear",
         if cmap == None: cmap = "bwr"
         norm = mpl.colors.SymLogNorm(linthresh=10, linscale=1.0,
                                      vmin=bbox[-2], vmax=bbox[-1], base=10)
-    for i in range(len(x)):
-        points = np.array([x[i], y[i], z[i]]).T.reshape(-1, 1, 3)
-        segments = np.concatenate([points[:-1], points[1:]], axis=1)
-
-        lc = mpl_toolkits.mplot3d.art3d.Line3DCollection(
-            segments, cmap=cmap, norm=norm)
-        lc.set_array(c[i][1:])
-        line = axes.add_collection(lc)
+    # Segments of all orbits are formed in one pass and plotted as a single
+    # collection. Segments connecting consecutive orbits are dropped.
+    keep, c = _segmentmask(x), np.concatenate(c)
+    points = np.array([np.concatenate(x), np.concatenate(y),
+                       np.concatenate(z)]).T.reshape(-1, 1, 3)
+    segments = np.concatenate([points[:-1], points[1:]], axis=1)
+
+    lc = mpl_toolkits.mplot3d.art3d.Line3DCollection(
+        segments[keep], cmap=cmap, norm=norm)
+    lc.set_array(c[1:][keep])
+    line = axes.add_collection(lc)
     smap = mpl.cm.ScalarMappable(norm=norm, cmap=cmap)
     plt.colorbar(smap, ax=axes, cax=cax)
 
@@ -145,15 +145,12 @@ class RunMixin():
         if endcond is not None:
             if not isinstance(endcond, list): endcond = [endcond]
 
-            # Go through each unique end cond and mark that end cond valid or
-            # not. This can then be used to make udix as boolean mask array.
-            uecs, uidx = np.unique(self._endstate.get("endcond"),
-                                   return_inverse=True)
+            # Check all unique end conds at once and mark them valid or not.
+            # This can then be used to make udix as boolean mask array.
+            uecs, uidx = self._endstate.endcond_unique()
             mask = np.zeros(uecs.shape, dtype=bool)
-            for i, uec in enumerate(uecs):
-                for ec in endcond:
-                    accept  = State.endcond_check(uec, ec)
-                    mask[i] = mask[i] or accept
+            for ec in endcond:
+                mask |= State.endcond_check(uecs, ec)
 
             idx = mask[uidx]
 
@@ -205,16 +202,25 @@ class RunMixin():
             was not initialized.
         """
         self._require("_orbit", "_inistate", "_endstate")
-        data = self._orbit.get(self._inistate, self._endstate, *qnt)
-        idarr = self._orbit.get(self._inistate, self._endstate, "ids")[0]
+
+        # Evaluate the quantities used for filtering with the same call
+        qnts = list(qnt)
+        if "ids" not in qnts:
+            qnts.append("ids")
+        if pncrid is not None and "pncrid" not in qnts:
+            qnts.append("pncrid")
+        data  = self._orbit.get(self._inistate, self._endstate, *qnts)
+        idarr = data[qnts.index("ids")]
+        if pncrid is not None:
+            pncridarr = data[qnts.index("pncrid")]
+        data = data[:len(qnt)]
+
         idx = np.ones(data[0].shape, dtype=bool)
         if endcond is not None:
             eids = self.getstate("ids", endcond=endcond)
             idx = np.logical_and(idx, np.in1d(idarr, eids))
 
         if pncrid is not None:
-            pncridarr = self._orbit.get(self._inistate, self._endstate,
-                                       "pncrid")[0]
             idx = np.logical_and(idx, np.in1d(pncridarr, pncrid))
 
         if ids is not None:
@@ -251,11 +257,12 @@ class RunMixin():
             Raised when data required for the operation is not present.
         """
         self._require("_endstate")
-        econd, emsg, emod, eline = self._endstate.get(
-            "endcond", "errormsg", "errormod", "errorline")
+        emsg, emod, eline = self._endstate.get(
+            "errormsg", "errormod", "errorline")
         errors = np.unique(np.array([emsg, eline, emod]), axis=1).T
 
-        ec, counts = np.unique(econd, return_counts=True)
+        ec, uidx = self._endstate.endcond_unique()
+        counts = np.bincount(uidx, minlength=ec.size)
         econds = []
         for i, e in enumerate(ec):
             econd = State.endcond_tostring(e)
@@ -1258,9 +1265,12 @@ class RunMixin():
             idarr, xc, yc, zc, cc = self.getorbit(
                 "ids", x, y, z, c, endcond=endcond, ids=ids)
 
-        # Find indices to map values from inistate to orbit array
-        _, idarr = np.unique(idarr, return_inverse=True)
-        idx = np.where(idarr[:-1] != idarr[1:])[0] + 1
+        # Find indices to map values from inistate to orbit array. The orbit
+        # data is sorted by ID so there is no need to sort it again.
+        idx = np.flatnonzero(idarr[:-1] != idarr[1:]) + 1
+        idarr = np.zeros(idarr.shape, dtype=int)
+        idarr[idx] = 1
+        idarr = np.cumsum(idarr)
         def parsevals(val, log, label, qnt):
             """Compute values and split them by orbit
             """
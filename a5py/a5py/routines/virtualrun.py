@@ -125,6 +125,13 @@ class VirtualState():
 
         return State._getactual(mode, _val, _eval, *qnt)
 
+    def endcond_unique(self):
+        """Return unique end conditions and their inverse indices.
+
+        See :meth:`State.endcond_unique`.
+        """
+        return np.unique(self.get("endcond"), return_inverse=True)
+
 class VirtualOrbits():
     """Like :class:`Orbits` but the data is in C array.
     """
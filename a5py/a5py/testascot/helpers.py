@@ -3,15 +3,18 @@ Helper routines and attributes for test modules.
 
 File: testascot/helpers.py
 """
+import os
+import h5py
+import tempfile
 import subprocess
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor
+
 from time import sleep
 from time import perf_counter as timer
 
-import a5py.ascot5io.ascot5      as ascot5
-import a5py.ascot5io.ascot5tools as tools
-import a5py.ascot5io.N0_3D       as N0_3D
+from a5py.ascot5io.coreio import fileapi
 
 ## Name of the test HDF5 file
 testfn = "test_ascot.h5"
@@ -46,6 +49,8 @@ def set_correct_input(parent, test):
         parent:  str Input parent
         test:   str Name of the tests
     """
+    import a5py.ascot5io.ascot5      as ascot5
+    import a5py.ascot5io.ascot5tools as tools
     a5 = ascot5.Ascot(testfn)
     typ = a5[parent][test].get_type()
     qid = a5[parent][test].get_qid()
@@ -78,3 +83,154 @@ def set_and_run(test):
     subprocess.call(["./"+testbin, "--in="+testfn[:-3], "--d="+test],
                     stdout=subprocess.DEVNULL)
     print("Completed test " + test + " in " + frm(timer() - start)) 
+
+
+def set_and_run_many(tests):
+    """
+    Carry out several test simulations one after another.
+
+    Equivalent to calling set_and_run for each test, but the test file is
+    parsed only once and the inputs are chosen via command line instead of
+    activating them in the file one group at a time.
+
+    Args:
+        tests: list [str] Names of the tests
+    """
+    frm   = lambda x: "%.3f s" % x
+    start = timer()
+    run_ascot5(testfn, tests, _commands(tests))
+    print("Completed tests " + ", ".join(tests) + " in " + frm(timer() - start))
+
+
+def run_parallel(tests, nproc=None):
+    """
+    Carry out several test simulations in parallel.
+
+    Unlike set_and_run, inputs are chosen via command line instead of
+    activating them in the file, so the simulations do not interfere with
+    each other. Each simulation writes to its own file and the results are
+    copied to the test file once all simulations are complete.
+
+    Args:
+        tests: list [str] Names of the tests
+        nproc: int Number of simulations run at once (default: all)
+    """
+    frm   = lambda x: "%.3f s" % x
+    start = timer()
+    run_ascot5(testfn, tests, _commands(tests), nproc or len(tests))
+    print("Completed tests " + ", ".join(tests) + " in " + frm(timer() - start))
+
+
+def run_ascot5(fn, tests, cmds, nproc=1):
+    """
+    Run ascot5 simulations and store their results in the given file.
+
+    With nproc == 1 the simulations are run one after another and each writes
+    directly to the file. Otherwise the simulations are run in parallel, each
+    writing to its own output file, and the results are copied to the file
+    once all simulations are complete.
+
+    Args:
+        fn:    str Name of the HDF5 file where the results are stored
+        tests: list [str] Names of the tests
+        cmds:  list [list [str]] Command that runs each test (without --out)
+        nproc: int Number of simulations run at once
+
+    Raises:
+        RuntimeError if a simulation fails or does not produce output
+    """
+    def call(test, cmd):
+        if subprocess.call(cmd, stdout=subprocess.DEVNULL) != 0:
+            raise RuntimeError(
+                "Simulation %s failed: %s" % (test, " ".join(cmd)))
+
+    if nproc == 1 or len(cmds) == 1:
+        for test, cmd in zip(tests, cmds):
+            call(test, cmd)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        outs = [os.path.join(tmpdir, test) for test in tests]
+        cmds = [cmd + ["--out=" + out] for cmd, out in zip(cmds, outs)]
+        with ThreadPoolExecutor(max_workers=nproc) as pool:
+            list(pool.map(call, tests, cmds))
+        for test, cmd, out in zip(tests, cmds, outs):
+            if not os.path.isfile(out + ".h5"):
+                raise RuntimeError(
+                    "Simulation %s produced no output: %s"
+                    % (test, " ".join(cmd)))
+        with h5py.File(fn, "a") as h5:
+            results = h5.require_group("results")
+            for out in outs:
+                with h5py.File(out + ".h5", "r") as h5out:
+                    for run in h5out["results"]:
+                        h5out.copy(h5out["results"][run], results, run)
+                    results.attrs["active"] = h5out["results"].attrs["active"]
+
+
+def _commands(tests):
+    """
+    Construct ascot5 command lines that run the given tests.
+
+    The inputs of each test are given as command line arguments, so the test
+    file only needs to be parsed once for all tests.
+
+    Args:
+        tests: list [str] Names of the tests
+
+    Returns:
+        List of commands, one for each test
+    """
+    import a5py.ascot5io.ascot5 as ascot5
+    a5 = ascot5.Ascot(testfn)
+    cmds = []
+    for test in tests:
+        cmd = ["./"+testbin, "--in="+testfn[:-3], "--d="+test]
+        for parent in ["bfield", "efield", "marker", "plasma", "neutral",
+                       "wall", "options", "boozer", "mhd", "asigma"]:
+            cmd.append("--" + parent + "=" + a5[parent][test].get_qid())
+        cmds.append(cmd)
+    return cmds
+
+
+def compress_orbits(tests):
+    """
+    Rewrite the orbit data of the given test runs compressed.
+
+    The orbit data is written uncompressed by the ascot5 binary. The test file
+    is rewritten with the orbit datasets of the given runs compressed with
+    gzip and byte shuffling (which groups the similar high-order bytes of
+    adjacent values). A new file is written since HDF5 does not reclaim the
+    space of deleted datasets.
+
+    Args:
+        tests: list [str] Names of the tests
+    """
+    tmpfn = testfn + ".tmp"
+    with h5py.File(testfn, "r") as h5, h5py.File(tmpfn, "w") as h5new:
+        h5new.attrs.update(h5.attrs)
+        for name in h5:
+            if name != "results":
+                h5.copy(h5[name], h5new, name)
+
+        results = h5new.create_group("results")
+        results.attrs.update(h5["results"].attrs)
+        for name, run in h5["results"].items():
+            if "orbit" not in run or fileapi.get_desc(h5, run) not in tests:
+                h5.copy(run, results, name)
+                continue
+            newrun = results.create_group(name)
+            newrun.attrs.update(run.attrs)
+            for child in run:
+                if child != "orbit":
+                    h5.copy(run[child], newrun, child)
+            orbit = newrun.create_group("orbit")
+            orbit.attrs.update(run["orbit"].attrs)
+            for qnt, dset in run["orbit"].items():
+                if dset.size == 0:
+                    h5.copy(dset, orbit, qnt)
+                    continue
+                orbit.create_dataset(qnt, data=dset[()], chunks=True,
+                                     compression="gzip", shuffle=True)
+                orbit[qnt].attrs.update(dset.attrs)
+    os.replace(tmpfn, testfn)
@@ -14,20 +14,45 @@ Implemented tests:
   - mhd: verify inclusion of MHD modes.
   - atomic: verify implementation of ionization and neutralization reactions.
 """
-import copy
+import h5py
 import unyt
-import subprocess
 import warnings
 import numpy as np
 import matplotlib.pyplot as plt
 
+from collections import ChainMap
+from concurrent.futures import ProcessPoolExecutor
 from matplotlib.gridspec import GridSpec
+from matplotlib.collections import LineCollection
 
 from a5py import Ascot, physlib
 from a5py.routines import plotting as a5plt
+from a5py.ascot5io import HDF5TOOBJ
 from a5py.ascot5io.options import Opt
 from a5py.ascot5io.marker import Marker
+from a5py.ascot5io.orbits import Orbits
 from a5py.ascot5io.bfield import B_2DS
+from a5py.ascot5io.coreio import fileapi
+from a5py.templates import InputFactory
+from a5py.testascot import helpers
+
+_THETA = np.linspace(0, 2*np.pi, 360)
+_SIN, _COS = np.sin(_THETA), np.cos(_THETA)
+"""Points on a unit circle used to plot analytical gyro-orbits."""
+
+_RNG = np.random.default_rng(0xA5C07)
+"""Random number generator for marker initialization (seeded for
+reproducibility)."""
+
+_INPUTS = ("options", "bfield", "efield", "marker", "wall", "plasma",
+           "neutral", "boozer", "mhd", "asigma")
+"""Input parents that are chosen for each test simulation."""
+
+_M2_S, _INV_M3 = unyt.m**2 / unyt.s, 1 / unyt.m**3
+"""Units of diffusion coefficients and densities in the transport tests."""
+
+_MP_ME = unyt.mp / unyt.me
+"""Proton-to-electron mass ratio."""
 
 class PhysTest():
 
@@ -50,6 +75,7 @@ class PhysTest():
     tag_ccoll_slowinggo    = "TESTCCOLLSLOWINGGO"
     tag_ccoll_slowinggcf   = "TESTCCOLLSLOWINGGCF"
     tag_ccoll_slowinggca   = "TESTCCOLLSLOWINGGCA"
+    tag_ccoll              = "TESTCCOLL"
     tag_classical_go       = "TESTCLASSGO"
     tag_classical_gcf      = "TESTCLASSGCF"
     tag_classical_gca      = "TESTCLASSGCA"
@@ -63,29 +89,54 @@ class PhysTest():
     tag_atomic_cx          = "TESTATOMICCX"
     tag_atomic_ionz        = "TESTATOMICIONZ"
 
+    # Tags of all simulations in the MHD and atomic tests
+    _tags_mhd    = (tag_mhd_go, tag_mhd_gcf, tag_mhd_gca)
+    _tags_atomic = (tag_atomic_cx, tag_atomic_ionz)
+
     def __init__(self, fn="testascot.h5"):
+        self._orbitcache = {}
+        self._nproc = 1
         try:
             self.ascot = Ascot(fn)
         except FileNotFoundError:
+            # Dummy inputs are written directly so that the data tree is built
+            # only once and not after every input
             self.ascot = Ascot(fn, create=True)
-            init = self.ascot.data.create_input
-            init("opt")
-            init("gc")
-            init("B_TC")
-            init("E_TC")
-            init("wall_2D")
-            init("plasma_1D")
-            init("N0_1D")
-            init("Boozer")
-            init("MHD_STAT")
-            init("asigma_loc")
-
-    def execute(self, init=True, run=True, check=True, tests=None):
+            for inp in ["opt", "gc", "B_TC", "E_TC", "wall_2D", "plasma_1D",
+                        "N0_1D", "Boozer", "MHD_STAT", "asigma_loc"]:
+                HDF5TOOBJ[inp].write_hdf5_dummy(fn)
+            self.ascot.data._build(fn)
+
+    def execute(self, init=True, run=True, check=True, tests=None, nproc=1):
         """Execute test(s).
 
         Parameters
         ----------
+        init : bool, optional
+            Initialize test inputs.
+        run : bool, optional
+            Run test simulations.
+        check : bool, optional
+            Check and plot test results.
+        tests : str or list [str], optional
+            Tests to execute or None to execute all tests.
+        nproc : int, optional
+            Number of processes used to run the simulations of a test and to
+            check the tests in parallel.
+
+            Initialization is always done sequentially as it writes to the same
+            file, so with ``nproc > 1`` the tests are checked only after all
+            tests have been initialized and run. Parallel simulations write to
+            separate files and their results are copied to the test file.
+
+        Returns
+        -------
+        passed : dict [str, bool]
+            Value returned by the check of each test that was checked, which is
+            True if the test passed or None if the check has no pass criteria.
         """
+        self._nproc = nproc
+        passed = {}
         if tests is None:
             tests = ["elementary", "orbitfollowing", "gctransform", "ccoll",
                      "classical", "neoclassical", "boozer", "mhd", "atomic"]
@@ -93,17 +144,31 @@ class PhysTest():
             tests = [tests]
 
         for test in tests:
+            self._orbitcache = {}
             if init:
                 getattr(self, "init_" + test)()
                 print("Test %s initialized" % test)
             if run:
                 getattr(self, "run_" + test)()
                 print("Test %s simulation complete" % test)
-            if check:
+            if check and nproc == 1:
                 a5plt.setpaperstyle()
-                getattr(self, "check_" + test)()
+                passed[test] = getattr(self, "check_" + test)()
                 print("Test %s check finished" % test)
 
+        if check and nproc > 1:
+            fn = self.ascot.file_getpath()
+            with ProcessPoolExecutor(max_workers=nproc) as pool:
+                for test, (passed[test], figs) in zip(
+                        tests, pool.map(_check, [fn] * len(tests), tests)):
+                    # Unpickling adds the figures back to pyplot; activating
+                    # them fails if a figure was not restored
+                    for fig in figs:
+                        plt.figure(fig)
+                    print("Test %s check finished" % test)
+
+        return passed
+
     def init_elementary(self):
         """Initialize data for the elementary test.
 
@@ -134,19 +199,21 @@ class PhysTest():
             "ENABLE_ORBITWRITE" : 1, "ORBITWRITE_MODE" : 1,
             "ORBITWRITE_INTERVAL" : 1e-11, "ORBITWRITE_NPOINT" : 202
         })
-        init("opt", **opt, desc=PhysTest.tag_elementary_gyro)
-        opt.update({
+        optgo = {
             "FIXEDSTEP_USERDEFINED" : 1e-10, "ENDCOND_LIM_SIMTIME" : 1e-7,
             "ORBITWRITE_NPOINT" : 10002
-        })
-        init("opt", **opt, desc=PhysTest.tag_elementary_exbgo)
-        init("opt", **opt, desc=PhysTest.tag_elementary_gradbgo)
-        opt.update({
+        }
+        optgc = {
             "SIM_MODE" : 2, "FIXEDSTEP_USERDEFINED" : 1e-9,
-            "ORBITWRITE_INTERVAL" : 1e-9, "ORBITWRITE_NPOINT" : 102
-        })
-        init("opt", **opt, desc=PhysTest.tag_elementary_exbgc)
-        init("opt", **opt, desc=PhysTest.tag_elementary_gradbgc)
+            "ENDCOND_LIM_SIMTIME" : 1e-7, "ORBITWRITE_INTERVAL" : 1e-9,
+            "ORBITWRITE_NPOINT" : 102
+        }
+        self._initoptions(opt, {
+            PhysTest.tag_elementary_gyro    : {},
+            PhysTest.tag_elementary_exbgo   : optgo,
+            PhysTest.tag_elementary_gradbgo : optgo,
+            PhysTest.tag_elementary_exbgc   : optgc,
+            PhysTest.tag_elementary_gradbgc : optgc})
 
         # Magnetic field
         d = {"bxyz" : np.array([5, 0, 0]),
@@ -171,14 +238,8 @@ class PhysTest():
         init("E_TC", **d, desc=PhysTest.tag_elementary_exbgc)
 
         # Marker input is an electron and positron
-        mrk = Marker.generate("gc", n=2, species="electron")
-        mrk["charge"]    = np.array([1, -1])
-        mrk["r"][:]      = 5
-        mrk["phi"][:]    = 90
-        mrk["z"][:]      = 0
-        mrk["zeta"][:]   = 0
-        mrk["energy"][:] = 100e6
-        mrk["pitch"][:]  = 0.5
+        mrk = _build_marker(2, "electron", charge=[1, -1], r=5, phi=90, z=0,
+                            zeta=0, energy=100e6, pitch=0.5)
 
         for tag in [PhysTest.tag_elementary_gyro,
                     PhysTest.tag_elementary_exbgo,
@@ -193,13 +254,11 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_elementary_gyro):
             warnings.warn("Results already present: Test elementary")
             return
-        for tag in [PhysTest.tag_elementary_gyro,
-                    PhysTest.tag_elementary_exbgo,
-                    PhysTest.tag_elementary_exbgc,
-                    PhysTest.tag_elementary_gradbgo,
-                    PhysTest.tag_elementary_gradbgc]:
-            self._activateinputs(tag)
-            self._runascot(tag)
+        self._runascot([PhysTest.tag_elementary_gyro,
+                        PhysTest.tag_elementary_exbgo,
+                        PhysTest.tag_elementary_exbgc,
+                        PhysTest.tag_elementary_gradbgo,
+                        PhysTest.tag_elementary_gradbgc])
 
     def check_elementary(self):
         """Verify and plot elementary test results.
@@ -216,7 +275,7 @@ class PhysTest():
         run_gradbgc = self.ascot.data[PhysTest.tag_elementary_gradbgc]
 
         # Initialize plots
-        fig = a5plt.figuredoublecolumn()
+        fig = a5plt.figuredoublecolumn(num="elementary", clear=True)
         gs = GridSpec(2, 3, figure=fig)
         h1a = fig.add_subplot(gs[0,0])
         h2a = fig.add_subplot(gs[0,1])
@@ -255,17 +314,19 @@ class PhysTest():
         larmorrad_ana = physlib.gyrolength(m, q, ekin, pitch, bnorm).to("m")
         gyrofreq_ana  = physlib.gyrofrequency(m, q, ekin, bnorm).to("rad/s")
 
-        # Numerical values
-        larmorrad_go = np.mean( np.sqrt( (x - x0[0])**2 + (y - y0[0])**2 ) )
-        gyrofreq_go  = np.sum( np.sqrt( np.diff(x)**2 + np.diff(y)**2 ) ) \
-            * unyt.rad / (larmorrad_go * time[-1])
+        # Numerical values (evaluated without units to avoid temporaries)
+        xv,  yv  = x.to_value("m"), y.to_value("m")
+        x0v, y0v = float(x0[0].to_value("m")), float(y0[0].to_value("m"))
+        larmorrad_go = np.mean( np.hypot(xv - x0v, yv - y0v) ) * unyt.m
+        gyrofreq_go  = np.sum( np.hypot(np.diff(xv), np.diff(yv)) ) \
+            * unyt.m * unyt.rad / (larmorrad_go * time[-1])
 
         # Plot
-        orbx = x - x0[0]
-        orby = y - y0[0]
+        orbx = xv - x0v
+        orby = yv - y0v
 
-        anax   = larmorrad_ana[0] * np.sin(np.linspace(0, 2*np.pi, 360))
-        anay   = larmorrad_ana[0] * np.cos(np.linspace(0, 2*np.pi, 360))
+        anax   = larmorrad_ana[0] * _SIN
+        anay   = larmorrad_ana[0] * _COS
         fangle = np.arctan2(orby[0], orbx[0]) * unyt.rad \
             + gyrofreq_ana[0] * time[-1]
         fx = larmorrad_ana[0] * np.cos(-fangle) # Minus sign because this we are
@@ -279,13 +340,13 @@ class PhysTest():
         ## E x B drift
         yi_go            = run_exbgo.getstate("z", state="ini")
         yf_go, deltat_go = run_exbgo.getstate("z", "mileage", state="end")
-        x_go1, y_go1     = run_exbgo.getorbit("y", "z", ids=1)
-        x_go2, y_go2     = run_exbgo.getorbit("y", "z", ids=2)
+        x_go1, y_go1     = self._getorbit(run_exbgo, "y", "z", ids=1)
+        x_go2, y_go2     = self._getorbit(run_exbgo, "y", "z", ids=2)
 
         yi_gc            = run_exbgc.getstate("z", state="ini")
         yf_gc, deltat_gc = run_exbgc.getstate("z", "mileage", state="end")
-        x_gc1, y_gc1     = run_exbgc.getorbit("y", "z", ids=1)
-        x_gc2, y_gc2     = run_exbgc.getorbit("y", "z", ids=2)
+        x_gc1, y_gc1     = self._getorbit(run_exbgc, "y", "z", ids=1)
+        x_gc2, y_gc2     = self._getorbit(run_exbgc, "y", "z", ids=2)
 
         # Analytical values
         bvec  = run_exbgo.bfield.read()["bxyz"].ravel()
@@ -298,10 +359,8 @@ class PhysTest():
         vgc_ExB = (yf_gc - yi_gc) / deltat_gc
 
         # Plot
-        h2a.plot(x_go1, y_go1)
-        h2b.plot(x_go2, y_go2)
-        h2a.plot(x_gc1, y_gc1)
-        h2b.plot(x_gc2, y_gc2)
+        h2a.plot(x_go1, y_go1, x_gc1, y_gc1)
+        h2b.plot(x_go2, y_go2, x_gc2, y_gc2)
 
         ini = np.array([x_gc1[0].v + .01, y_gc1[0].v])
         end = np.array([x_gc1[0].v + .01, (y_gc1[0] + v_ExB[2]*deltat_gc[1]).v])
@@ -315,13 +374,13 @@ class PhysTest():
             "pitch", "ekin", "charge", "mass", ids=1)
         xi_go            = run_gradbgo.getstate("y", state="ini")
         xf_go, deltat_go = run_gradbgo.getstate("y", "mileage", state="end")
-        x_go1, y_go1     = run_gradbgo.getorbit("y", "z", ids=1)
-        x_go2, y_go2     = run_gradbgo.getorbit("y", "z", ids=2)
+        x_go1, y_go1     = self._getorbit(run_gradbgo, "y", "z", ids=1)
+        x_go2, y_go2     = self._getorbit(run_gradbgo, "y", "z", ids=2)
 
         xi_gc            = run_gradbgc.getstate("y", state="ini")
         xf_gc, deltat_gc = run_gradbgc.getstate("y", "mileage", state="end")
-        x_gc1, y_gc1     = run_gradbgc.getorbit("y", "z", ids=1)
-        x_gc2, y_gc2     = run_gradbgc.getorbit("y", "z", ids=2)
+        x_gc1, y_gc1     = self._getorbit(run_gradbgc, "y", "z", ids=1)
+        x_gc2, y_gc2     = self._getorbit(run_gradbgc, "y", "z", ids=2)
 
         # Analytical values
         gamma   = physlib.gamma_energy(m, ekin)
@@ -339,10 +398,8 @@ class PhysTest():
         vgc_gradb = (xf_gc - xi_gc) / deltat_gc
 
         # Plot
-        h3a.plot(x_go1, y_go1)
-        h3b.plot(x_go2, y_go2)
-        h3a.plot(x_gc1, y_gc1)
-        h3b.plot(x_gc2, y_gc2)
+        h3a.plot(x_go1, y_go1, x_gc1, y_gc1)
+        h3b.plot(x_go2, y_go2, x_gc2, y_gc2)
 
         ini = np.array([x_gc1[0].v, y_gc1[0].v + .01])
         end = np.array([x_gc1[0] + v_gradb[1]*deltat_gc[0], y_gc1[0].v + .01])
@@ -370,10 +427,10 @@ class PhysTest():
               % (vgc_ExB[0], vgc_ExB[1]) )
         print("  ExB drift for positrons %e electrons %e (expected)" \
               % (v_ExB[2], v_ExB[2]) )
-        err = np.amax([np.abs( ( vgo_ExB[0] - v_ExB[2] ) / v_ExB[2] ),
-                       np.abs( ( vgo_ExB[1] - v_ExB[2] ) / v_ExB[2] ),
-                       np.abs( ( vgc_ExB[0] - v_ExB[2] ) / v_ExB[2] ),
-                       np.abs( ( vgc_ExB[1] - v_ExB[2] ) / v_ExB[2] )])
+        v   = v_ExB[2].to_value("m/s")
+        err = np.amax(np.abs(
+            np.concatenate([vgo_ExB.to_value("m/s"), vgc_ExB.to_value("m/s")])
+            - v ) / np.abs(v))
         if err > 5e-5: print("Error: %e (FAILED)" % err); passed = False
 
         print("  Grad-B drift for positrons %e electrons %e (gyro-orbit)" \
@@ -382,10 +439,11 @@ class PhysTest():
               % (vgc_gradb[0], vgc_gradb[1]) )
         print("  Grad-B drift for positrons %e electrons %e (expected)" \
               % (v_gradb[1], -v_gradb[1]) )
-        err = np.amax([np.abs( ( vgo_gradb[0] - v_gradb[1] ) / v_gradb[1] ),
-                       np.abs( ( vgo_gradb[1] + v_gradb[1] ) / v_gradb[1] ),
-                       np.abs( ( vgc_gradb[0] - v_gradb[1] ) / v_gradb[1] ),
-                       np.abs( ( vgc_gradb[1] + v_gradb[1] ) / v_gradb[1] )])
+        # Positrons and electrons drift in opposite directions
+        v   = v_gradb[1].to_value("m/s") * np.array([1, -1, 1, -1])
+        err = np.amax(np.abs(
+            np.concatenate([vgo_gradb.to_value("m/s"),
+                            vgc_gradb.to_value("m/s")]) - v ) / np.abs(v))
         if err > 1e-3: print("Error: %e (FAILED)" % err); passed = False
 
         return passed
@@ -396,7 +454,6 @@ class PhysTest():
         if hasattr(self.ascot.data.options, PhysTest.tag_orbfol_go):
             warnings.warn("Inputs already present: Test orbit-following")
             return
-        init = self.ascot.data.create_input
 
         # Options
         opt = Opt.get_default()
@@ -407,37 +464,30 @@ class PhysTest():
             "ENABLE_ORBITWRITE" : 1, "ORBITWRITE_MODE" : 1,
             "ORBITWRITE_INTERVAL" : 1e-10, "ORBITWRITE_NPOINT" : 50002
         })
-        init("opt", **opt, desc=PhysTest.tag_orbfol_go)
-        opt.update({
-            "SIM_MODE" : 2, "FIXEDSTEP_USERDEFINED" : 1e-12,
-            "ENABLE_ADAPTIVE" : 0,
-            "ORBITWRITE_INTERVAL" : 1e-8, "ORBITWRITE_NPOINT" : 502
-        })
-        init("opt", **opt, desc=PhysTest.tag_orbfol_gcf)
-        opt.update({
-            "ENABLE_ADAPTIVE" : 1, "ADAPTIVE_MAX_DRHO" : 0.1,
-            "ADAPTIVE_MAX_DPHI" : 10, "ADAPTIVE_TOL_ORBIT" : 1e-10,
-            "FIXEDSTEP_USERDEFINED" : 1e-8
-        })
-        init("opt", **opt, desc=PhysTest.tag_orbfol_gca)
-
-        # Magnetic field is just some tokamak
-        init("bfield_analytical_iter_circular", desc=PhysTest.tag_orbfol_go)
-        init("bfield_analytical_iter_circular", desc=PhysTest.tag_orbfol_gcf)
-        init("bfield_analytical_iter_circular", desc=PhysTest.tag_orbfol_gca)
-
-        # Marker input is a trapped positron and a passing electron
-        mrk = Marker.generate("gc", n=2, species="electron")
-        mrk["charge"]    = np.array([1, -1])
-        mrk["r"][:]      = 7.6
-        mrk["phi"][:]    = 90
-        mrk["z"][:]      = 0
-        mrk["zeta"][:]   = 2
-        mrk["energy"][:] = 10e6
-        mrk["pitch"]     = np.array([0.4, 0.9])
-        for tag in [PhysTest.tag_orbfol_go, PhysTest.tag_orbfol_gcf,
-                    PhysTest.tag_orbfol_gca]:
-            init("gc", **mrk, desc=tag)
+        self._initoptions(opt, {
+            PhysTest.tag_orbfol_go  : {},
+            PhysTest.tag_orbfol_gcf : {
+                "SIM_MODE" : 2, "FIXEDSTEP_USERDEFINED" : 1e-12,
+                "ENABLE_ADAPTIVE" : 0,
+                "ORBITWRITE_INTERVAL" : 1e-8, "ORBITWRITE_NPOINT" : 502
+            },
+            PhysTest.tag_orbfol_gca : {
+                "SIM_MODE" : 2, "FIXEDSTEP_USERDEFINED" : 1e-8,
+                "ENABLE_ADAPTIVE" : 1, "ADAPTIVE_MAX_DRHO" : 0.1,
+                "ADAPTIVE_MAX_DPHI" : 10, "ADAPTIVE_TOL_ORBIT" : 1e-10,
+                "ORBITWRITE_INTERVAL" : 1e-8, "ORBITWRITE_NPOINT" : 502
+            }})
+
+        # Magnetic field is just some tokamak (constructed and written only
+        # once) and marker input is a trapped positron and a passing electron
+        mrk = _build_marker(2, "electron", charge=[1, -1], r=7.6, phi=90, z=0,
+                            zeta=2, energy=10e6, pitch=[0.4, 0.9])
+        tags = [PhysTest.tag_orbfol_go, PhysTest.tag_orbfol_gcf,
+                PhysTest.tag_orbfol_gca]
+        self._initinputs([
+            ("bfield_analytical_iter_circular", tags, {}),
+            ("gc", tags, mrk),
+        ])
 
     def run_orbitfollowing(self):
         """Run orbit-following test.
@@ -445,10 +495,8 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_orbfol_go):
             warnings.warn("Results already present: Test orbit-following")
             return
-        for tag in [PhysTest.tag_orbfol_go, PhysTest.tag_orbfol_gcf,
-                    PhysTest.tag_orbfol_gca]:
-            self._activateinputs(tag)
-            self._runascot(tag)
+        self._runascot([PhysTest.tag_orbfol_go, PhysTest.tag_orbfol_gcf,
+                        PhysTest.tag_orbfol_gca])
 
     def check_orbitfollowing(self):
         """Check test.
@@ -458,7 +506,7 @@ class PhysTest():
         run_gca = self.ascot.data[PhysTest.tag_orbfol_gca]
 
         # Initialize plots
-        fig = a5plt.figuredoublecolumn(3/2)
+        fig = a5plt.figuredoublecolumn(3/2, num="orbitfollowing", clear=True)
         gs = GridSpec(3, 4, figure=fig)
         h1a = fig.add_subplot(gs[0,0])
         h2a = fig.add_subplot(gs[1,0])
@@ -502,18 +550,35 @@ class PhysTest():
         h3a.set_xlabel("Time [µs]")
         h3b.set_xlabel("Time [µs]")
 
-        def plotreldiff(ax1, ax2, ax3, t, q1, q2, q3, **kwargs):
+        def reldiff(*q):
+            """Return relative difference (q-q0)/q0 of given quantities.
+            """
+            return [qi.v / qi.v[0] - 1 for qi in q]
+
+        def plotreldiff(axes, t, *q):
             """Plot relative diffenrence of given quantities on given axes.
+
+            Each axis gets a single line collection that contains the line of
+            each simulation (colored C0, C1, ...) for the corresponding
+            quantity.
             """
-            ax1.plot(t, ( q1 - q1[0] ) / q1[0], **kwargs)
-            ax2.plot(t, ( q2 - q2[0] ) / q2[0], **kwargs)
-            ax3.plot(t, ( q3 - q3[0] ) / q3[0], **kwargs)
+            colors = ["C%d" % i for i in range(len(t))]
+            t = [ti * 1e6 for ti in t]
+            for ax, qi in zip(axes, q):
+                lines = [np.column_stack([tj, qj]) for tj, qj in zip(t, qi)]
+                ax.add_collection(LineCollection(lines, colors=colors))
+                ax.autoscale_view()
 
         def fails(t, q, eps, qnt, otype, mode):
             """Check if the change in time of a given quantity is below given
             tolerance
+
+            The rate of change is the slope of a linear least-squares fit,
+            which is evaluated here in closed form for the relative difference
+            ``q`` computed with ``reldiff``.
             """
-            err = np.polyfit(t, (q - q[0]) / q[0], 1)[0]
+            dt = t - t.mean()
+            err = np.dot(dt, q - q.mean()) / np.dot(dt, dt)
             msg = "Rate of change in %6s (%s/%11s): %e Tolerance: %e" \
                 % (qnt, otype, mode, err, eps)
             if err > eps:
@@ -523,35 +588,43 @@ class PhysTest():
             print(msg)
             return True
 
-        # Numerical values
+        # Numerical values. Mileage [s] and R,z [m] are stored in the file as
+        # they are and only the invariants need to be evaluated. The invariants
+        # are converted to relative differences once for plotting and checks.
+        # Energy and mu are evaluated from the stored magnetic field vector, so
+        # the field needs to be initialized only for Ptor which requires psi.
+        cols = ("mileage", "r", "z")
+        tgo1,  rgo1,  zgo1  = self._getorbit(run_go,  *cols, ids=1, raw=True)
+        tgo2,  rgo2,  zgo2  = self._getorbit(run_go,  *cols, ids=2, raw=True)
+        tgcf1, rgcf1, zgcf1 = self._getorbit(run_gcf, *cols, ids=1, raw=True)
+        tgcf2, rgcf2, zgcf2 = self._getorbit(run_gcf, *cols, ids=2, raw=True)
+        tgca1, rgca1, zgca1 = self._getorbit(run_gca, *cols, ids=1, raw=True)
+        tgca2, rgca2, zgca2 = self._getorbit(run_gca, *cols, ids=2, raw=True)
+
+        qnt = ("ekin", "mu")
+        ego1,  mugo1  = reldiff(*self._getorbit(run_go,  *qnt, ids=1))
+        ego2,  mugo2  = reldiff(*self._getorbit(run_go,  *qnt, ids=2))
+        egcf1, mugcf1 = reldiff(*self._getorbit(run_gcf, *qnt, ids=1))
+        egcf2, mugcf2 = reldiff(*self._getorbit(run_gcf, *qnt, ids=2))
+        egca1, mugca1 = reldiff(*self._getorbit(run_gca, *qnt, ids=1))
+        egca2, mugca2 = reldiff(*self._getorbit(run_gca, *qnt, ids=2))
+
         self.ascot.input_init(run=run_go.get_qid(), bfield=True)
-        tgo1, ego1, mugo1, pgo1, rgo1, zgo1 = run_go.getorbit(
-            "mileage", "ekin", "mu", "ptor", "r", "z", ids=1)
-        tgo2, ego2, mugo2, pgo2, rgo2, zgo2 = run_go.getorbit(
-            "mileage", "ekin", "mu", "ptor", "r", "z", ids=2)
-        tgcf1, egcf1, mugcf1, pgcf1, rgcf1, zgcf1 = run_gcf.getorbit(
-            "mileage", "ekin", "mu", "ptor", "r", "z", ids=1)
-        tgcf2, egcf2, mugcf2, pgcf2, rgcf2, zgcf2 = run_gcf.getorbit(
-            "mileage", "ekin", "mu", "ptor", "r", "z", ids=2)
-        tgca1, egca1, mugca1, pgca1, rgca1, zgca1 = run_gca.getorbit(
-            "mileage", "ekin", "mu", "ptor", "r", "z", ids=1)
-        tgca2, egca2, mugca2, pgca2, rgca2, zgca2 = run_gca.getorbit(
-            "mileage", "ekin", "mu", "ptor", "r", "z", ids=2)
+        pgo1,  pgo2  = reldiff(*(self._getorbit(run_go,  "ptor", ids=i)
+                                 for i in (1, 2)))
+        pgcf1, pgcf2 = reldiff(*(self._getorbit(run_gcf, "ptor", ids=i)
+                                 for i in (1, 2)))
+        pgca1, pgca2 = reldiff(*(self._getorbit(run_gca, "ptor", ids=i)
+                                 for i in (1, 2)))
         self.ascot.input_free()
 
         # Plot
-        plotreldiff(h1a, h2a, h3a, tgo1.to("µs"),  ego1,  mugo1,  pgo1,
-                    color="C0")
-        plotreldiff(h1b, h2b, h3b, tgo2.to("µs"),  ego2,  mugo2,  pgo2,
-                    color="C0")
-        plotreldiff(h1a, h2a, h3a, tgcf1.to("µs"), egcf1, mugcf1, pgcf1,
-                    color="C1")
-        plotreldiff(h1b, h2b, h3b, tgcf2.to("µs"), egcf2, mugcf2, pgcf2,
-                    color="C1")
-        plotreldiff(h1a, h2a, h3a, tgca1.to("µs"), egca1, mugca1, pgca1,
-                    color="C2")
-        plotreldiff(h1b, h2b, h3b, tgca2.to("µs"), egca2, mugca2, pgca2,
-                    color="C2")
+        plotreldiff([h1a, h2a, h3a], [tgo1, tgcf1, tgca1],
+                    [ego1, egcf1, egca1], [mugo1, mugcf1, mugca1],
+                    [pgo1, pgcf1, pgca1])
+        plotreldiff([h1b, h2b, h3b], [tgo2, tgcf2, tgca2],
+                    [ego2, egcf2, egca2], [mugo2, mugcf2, mugca2],
+                    [pgo2, pgcf2, pgca2])
 
         h4a.plot(rgo1,  zgo1,  color="C0")
         h4a.plot(rgcf1, zgcf1, color="C1")
@@ -592,7 +665,6 @@ class PhysTest():
         if hasattr(self.ascot.data.options, PhysTest.tag_gctransform_go):
             warnings.warn("Inputs already present: Test GC transform")
             return
-        init = self.ascot.data.create_input
 
         # Options
         opt = Opt.get_default()
@@ -603,39 +675,29 @@ class PhysTest():
             "ENABLE_ORBITWRITE" : 1, "ORBITWRITE_MODE" : 1,
             "ORBITWRITE_INTERVAL" : 4e-10, "ORBITWRITE_NPOINT" : 75002
         })
-        init("opt", **opt, desc=PhysTest.tag_gctransform_gc)
-        init("opt", **opt, desc=PhysTest.tag_gctransform_first)
-        opt.update({"DISABLE_FIRSTORDER_GCTRANS" : 1})
-        init("opt", **opt, desc=PhysTest.tag_gctransform_zeroth)
-
-        opt.update({"DISABLE_FIRSTORDER_GCTRANS" : 0, "SIM_MODE" : 1 })
-        init("opt", **opt, desc=PhysTest.tag_gctransform_go)
-        opt.update({"RECORD_MODE" : 1 })
-        init("opt", **opt, desc=PhysTest.tag_gctransform_go2gc)
-
-        # Magnetic field is just some tokamak
-        init("bfield_analytical_iter_circular",
-             desc=PhysTest.tag_gctransform_go)
-        init("bfield_analytical_iter_circular",
-             desc=PhysTest.tag_gctransform_gc)
-        init("bfield_analytical_iter_circular",
-             desc=PhysTest.tag_gctransform_go2gc)
-        init("bfield_analytical_iter_circular",
-             desc=PhysTest.tag_gctransform_zeroth)
-        init("bfield_analytical_iter_circular",
-             desc=PhysTest.tag_gctransform_first)
-
-        # Use single alpha particle in tests
-        mrk = Marker.generate("gc", n=1, species="alpha")
-        mrk["r"][:]      = 7.6
-        mrk["phi"][:]    = 90
-        mrk["z"][:]      = 0
-        mrk["zeta"][:]   = 2
-        mrk["energy"][:] = 3.5e6
-        mrk["pitch"][:]  = 0.4
-        init("gc", **mrk, desc=PhysTest.tag_gctransform_go)
-        init("gc", **mrk, desc=PhysTest.tag_gctransform_gc)
-        init("gc", **mrk, desc=PhysTest.tag_gctransform_go2gc)
+        self._initoptions(opt, {
+            PhysTest.tag_gctransform_gc     : {},
+            PhysTest.tag_gctransform_first  : {},
+            PhysTest.tag_gctransform_zeroth : {
+                "DISABLE_FIRSTORDER_GCTRANS" : 1},
+            PhysTest.tag_gctransform_go     : {"SIM_MODE" : 1},
+            PhysTest.tag_gctransform_go2gc  : {
+                "SIM_MODE" : 1, "RECORD_MODE" : 1}})
+
+        # Magnetic field is just some tokamak (constructed and written only
+        # once) and a single alpha particle is used in tests
+        mrk = _build_marker(1, "alpha", r=7.6, phi=90, z=0, zeta=2,
+                            energy=3.5e6, pitch=0.4)
+        self._initinputs([
+            ("bfield_analytical_iter_circular", [
+                PhysTest.tag_gctransform_go, PhysTest.tag_gctransform_gc,
+                PhysTest.tag_gctransform_go2gc,
+                PhysTest.tag_gctransform_zeroth,
+                PhysTest.tag_gctransform_first], {}),
+            ("gc", [
+                PhysTest.tag_gctransform_go, PhysTest.tag_gctransform_gc,
+                PhysTest.tag_gctransform_go2gc], mrk),
+        ])
 
     def run_gctransform(self):
         """Run GC transform test.
@@ -644,10 +706,9 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_gctransform_go):
             warnings.warn("Results already present: Test GC transform")
             return
-        for tag in [PhysTest.tag_gctransform_go, PhysTest.tag_gctransform_gc,
-                    PhysTest.tag_gctransform_go2gc]:
-            self._activateinputs(tag)
-            self._runascot(tag)
+        self._runascot([PhysTest.tag_gctransform_go,
+                        PhysTest.tag_gctransform_gc,
+                        PhysTest.tag_gctransform_go2gc])
 
         # Create new marker input from results
         nrep = 10
@@ -666,10 +727,8 @@ class PhysTest():
         init("prt", **mrk, desc=PhysTest.tag_gctransform_zeroth)
         init("prt", **mrk, desc=PhysTest.tag_gctransform_first)
 
-        for tag in [PhysTest.tag_gctransform_zeroth,
-                    PhysTest.tag_gctransform_first]:
-            self._activateinputs(tag)
-            self._runascot(tag)
+        self._runascot([PhysTest.tag_gctransform_zeroth,
+                        PhysTest.tag_gctransform_first])
 
     def check_gctransform(self):
         """Check test.
@@ -681,7 +740,7 @@ class PhysTest():
         run_first  = self.ascot.data[PhysTest.tag_gctransform_first]
 
         # Initialize plots
-        fig = a5plt.figuredoublecolumn(3/2)
+        fig = a5plt.figuredoublecolumn(3/2, num="gctransform", clear=True)
         gs  = GridSpec(3, 3, figure=fig)
         h1a = fig.add_subplot(gs[0,0])
         h1b = fig.add_subplot(gs[1,0])
@@ -736,39 +795,42 @@ class PhysTest():
         h2.plot(rgo2gc, zgo2gc)
         h2.plot(rgc, zgc)
 
-        nrep = run_zeroth.getstate("ids").size
-        for i in range(nrep):
-            r, z = run_zeroth.getorbit("r", "z", ids=i)
-            h3.plot(r, z, color="C1")
-        for i in range(nrep):
-            r, z = run_first.getorbit("r", "z", ids=i)
-            h3.plot(r.v+0.01, z, color="C2")
+        # Orbits of all markers are read at once and plotted as a single
+        # collection, splitting the data where the marker ID changes
+        for run, dr, color in [(run_zeroth, 0, "C1"), (run_first, 0.01, "C2")]:
+            ids, r, z = run.getorbit("ids", "r", "z")
+            lines = np.split(np.column_stack([r.v + dr, z.v]),
+                             np.flatnonzero(np.diff(ids)) + 1)
+            h3.add_collection(LineCollection(lines, colors=color))
         h3.plot(rgo2gc, zgo2gc, color="black")
 
         # Verify results by interpolating the orbits at fixed intervals and then
         # calculating sum-of-squares of the difference between go and gc and
         # go2gc and gc. The latter should be smaller if the guiding center
-        # transformation works.
+        # transformation works. The quantities of each orbit are interpolated
+        # together as rows of a single array.
         t = np.linspace(0, 1e-6, 1000)
-        mugo    = np.interp(t, tgo,    mugo)
-        mugc    = np.interp(t, tgc,    mugc)
-        mugo2gc = np.interp(t, tgo2gc, mugo2gc)
-        ego    = np.interp(t, tgo,    ego)
-        egc    = np.interp(t, tgc,    egc)
-        ego2gc = np.interp(t, tgo2gc, ego2gc)
-        pgo    = np.interp(t, tgo,    pgo)
-        pgc    = np.interp(t, tgc,    pgc)
-        pgo2gc = np.interp(t, tgo2gc, pgo2gc)
-
-        err1 = np.sum( (mugo    - mugc)**2 )
-        err2 = np.sum( (mugo2gc - mugc)**2 )
-        print(err2/err1)
-        err1 = np.sum( (ego    - egc)**2 )
-        err2 = np.sum( (ego2gc - egc)**2 )
-        print(err2/err1)
-        err1 = np.sum( (pgo    - pgc)**2 )
-        err2 = np.sum( (pgo2gc - pgc)**2 )
-        print(err2/err1)
+        def interp(tvec, *q):
+            """Interpolate quantities at t (clamped at the ends).
+
+            The interval and the weight of each point are found once and shared
+            by all quantities.
+            """
+            tvec = tvec.v
+            q  = np.vstack([qi.v for qi in q])
+            tc = np.clip(t, tvec[0], tvec[-1])
+            i  = np.clip(tvec.searchsorted(tc, "right") - 1, 0, tvec.size - 2)
+            w  = (tc - tvec[i]) / (tvec[i+1] - tvec[i])
+            return (1 - w) * q[:,i] + w * q[:,i+1]
+        qgo    = interp(tgo,    mugo,    ego,    pgo)
+        qgc    = interp(tgc,    mugc,    egc,    pgc)
+        qgo2gc = interp(tgo2gc, mugo2gc, ego2gc, pgo2gc)
+
+        # Ratios for mu, energy, and Ptor
+        err1 = np.sum( (qgo    - qgc)**2, axis=1 )
+        err2 = np.sum( (qgo2gc - qgc)**2, axis=1 )
+        for ratio in err2/err1:
+            print(ratio)
 
     def init_ccoll(self):
         """Initialize data for the Coulomb collision test.
@@ -792,17 +854,19 @@ class PhysTest():
             "DIST_NBIN_PPA" : 140, "DIST_MIN_PPE" : 0, "DIST_MAX_PPE" : 2.5e-21,
             "DIST_NBIN_PPE" : 80
         })
-
-        opt.update({"SIM_MODE" : 1, "FIXEDSTEP_USE_USERDEFINED" : 1,
-                    "FIXEDSTEP_USERDEFINED" : 1e-8})
-        init("opt", **opt, desc=PhysTest.tag_ccoll_thermalgo)
-        opt.update({"SIM_MODE" : 2, "FIXEDSTEP_USE_USERDEFINED" : 1,
-                    "FIXEDSTEP_USERDEFINED" : 2e-8})
-        init("opt", **opt, desc=PhysTest.tag_ccoll_thermalgcf)
-        opt.update({"ENABLE_ADAPTIVE" : 1, "ADAPTIVE_TOL_ORBIT" : 1e-6,
-                    "ADAPTIVE_TOL_CCOL" : 1e-2, "ADAPTIVE_MAX_DRHO" : 0.1,
-                    "ADAPTIVE_MAX_DPHI" : 10, "FIXEDSTEP_USERDEFINED" : 1e-8})
-        init("opt", **opt, desc=PhysTest.tag_ccoll_thermalgca)
+        self._initoptions(opt, {
+            PhysTest.tag_ccoll_thermalgo : {
+                "SIM_MODE" : 1, "FIXEDSTEP_USE_USERDEFINED" : 1,
+                "FIXEDSTEP_USERDEFINED" : 1e-8},
+            PhysTest.tag_ccoll_thermalgcf : {
+                "SIM_MODE" : 2, "FIXEDSTEP_USE_USERDEFINED" : 1,
+                "FIXEDSTEP_USERDEFINED" : 2e-8},
+            PhysTest.tag_ccoll_thermalgca : {
+                "SIM_MODE" : 2, "FIXEDSTEP_USE_USERDEFINED" : 1,
+                "ENABLE_ADAPTIVE" : 1, "ADAPTIVE_TOL_ORBIT" : 1e-6,
+                "ADAPTIVE_TOL_CCOL" : 1e-2, "ADAPTIVE_MAX_DRHO" : 0.1,
+                "ADAPTIVE_MAX_DPHI" : 10, "FIXEDSTEP_USERDEFINED" : 1e-8},
+        })
 
         opt = Opt.get_default()
         opt.update({
@@ -817,46 +881,39 @@ class PhysTest():
             "DIST_NBIN_PPA" : 200, "DIST_MIN_PPE" : 0, "DIST_MAX_PPE" : 1.3e-19,
             "DIST_NBIN_PPE" : 100
         })
+        self._initoptions(opt, {
+            PhysTest.tag_ccoll_slowinggo : {
+                "SIM_MODE" : 1, "FIXEDSTEP_USE_USERDEFINED" : 1,
+                "FIXEDSTEP_USERDEFINED" : 2e-9},
+            PhysTest.tag_ccoll_slowinggcf : {
+                "SIM_MODE" : 2, "FIXEDSTEP_USE_USERDEFINED" : 1,
+                "FIXEDSTEP_USERDEFINED" : 3e-8},
+            PhysTest.tag_ccoll_slowinggca : {
+                "SIM_MODE" : 2, "FIXEDSTEP_USE_USERDEFINED" : 1,
+                "ENABLE_ADAPTIVE" : 1, "ADAPTIVE_TOL_ORBIT" : 1e-6,
+                "ADAPTIVE_TOL_CCOL" : 1e-2, "ADAPTIVE_MAX_DRHO" : 0.1,
+                "ADAPTIVE_MAX_DPHI" : 10, "FIXEDSTEP_USERDEFINED" : 1e-8},
+        })
 
-        opt.update({"SIM_MODE" : 1, "FIXEDSTEP_USE_USERDEFINED" : 1,
-                    "FIXEDSTEP_USERDEFINED" : 2e-9})
-        init("opt", **opt, desc=PhysTest.tag_ccoll_slowinggo)
-        opt.update({"SIM_MODE" : 2, "FIXEDSTEP_USE_USERDEFINED" : 1,
-                    "FIXEDSTEP_USERDEFINED" : 3e-8})
-        init("opt", **opt, desc=PhysTest.tag_ccoll_slowinggcf)
-        opt.update({"ENABLE_ADAPTIVE" : 1, "ADAPTIVE_TOL_ORBIT" : 1e-6,
-                    "ADAPTIVE_TOL_CCOL" : 1e-2, "ADAPTIVE_MAX_DRHO" : 0.1,
-                    "ADAPTIVE_MAX_DPHI" : 10, "FIXEDSTEP_USERDEFINED" : 1e-8})
-        init("opt", **opt, desc=PhysTest.tag_ccoll_slowinggca)
-
-        # Magnetic field is just some tokamak and plasma is uniform
-        for tag in [PhysTest.tag_ccoll_thermalgo, PhysTest.tag_ccoll_thermalgcf,
-                    PhysTest.tag_ccoll_thermalgca, PhysTest.tag_ccoll_slowinggo,
-                    PhysTest.tag_ccoll_slowinggcf, PhysTest.tag_ccoll_slowinggca
-                    ]:
-            init("bfield_analytical_iter_circular", desc=tag)
-            init("plasma_flat", density=1e20, temperature=1e3, desc=tag)
-
-        mrk = Marker.generate("gc", n=20, species="proton")
-        pol = 2 * np.pi * np.random.rand(mrk["n"],)
-        mrk["r"][:]      = 6.2 + 0.8 * np.cos(pol)
-        mrk["phi"][:]    = 90
-        mrk["z"][:]      = 0.8 * np.sin(pol)
-        mrk["zeta"][:]   = 2 * np.pi * np.random.rand(mrk["n"],)
-        mrk["energy"][:] = 1.e3
-        mrk["pitch"][:]  = 0.5
+        # Magnetic field is just some tokamak and plasma is uniform. These are
+        # shared by all simulations in this test so they are written only once.
+        init("bfield_analytical_iter_circular", desc=PhysTest.tag_ccoll)
+        init("plasma_flat", density=1e20, temperature=1e3,
+             desc=PhysTest.tag_ccoll)
+
+        pol, zeta = 2 * np.pi * _RNG.random((2, 20))
+        mrk = _build_marker(20, "proton", r=6.2 + 0.8 * np.cos(pol), phi=90,
+                            z=0.8 * np.sin(pol), zeta=zeta, energy=1.e3,
+                            pitch=0.5)
         init("gc", **mrk, desc=PhysTest.tag_ccoll_thermalgo)
         init("gc", **mrk, desc=PhysTest.tag_ccoll_thermalgcf)
         init("gc", **mrk, desc=PhysTest.tag_ccoll_thermalgca)
 
-        mrk = Marker.generate("gc", n=200, species="alpha")
-        pol = 2 * np.pi * np.random.rand(mrk["n"],)
-        mrk["r"][:]      = 6.2 + 0.8 * np.cos(pol)
-        mrk["phi"][:]    = 90
-        mrk["z"][:]      = 0.8 * np.sin(pol)
-        mrk["zeta"][:]   = 2 * np.pi * np.random.rand(mrk["n"],)
-        mrk["energy"][:] = 3.5e6
-        mrk["pitch"][:]  = 1.0 - 2.0 * np.random.rand(mrk["n"],)
+        u = _RNG.random((3, 200))
+        pol = 2 * np.pi * u[0]
+        mrk = _build_marker(200, "alpha", r=6.2 + 0.8 * np.cos(pol), phi=90,
+                            z=0.8 * np.sin(pol), zeta=2 * np.pi * u[1],
+                            energy=3.5e6, pitch=1.0 - 2.0 * u[2])
         init("gc", **mrk, desc=PhysTest.tag_ccoll_slowinggo)
         init("gc", **mrk, desc=PhysTest.tag_ccoll_slowinggcf)
         init("gc", **mrk, desc=PhysTest.tag_ccoll_slowinggca)
@@ -867,12 +924,11 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_ccoll_thermalgo):
             warnings.warn("Results already present: Test Coulomb collision")
             return
-        for tag in [PhysTest.tag_ccoll_thermalgo, PhysTest.tag_ccoll_thermalgcf,
-                    PhysTest.tag_ccoll_thermalgca, PhysTest.tag_ccoll_slowinggo,
-                    PhysTest.tag_ccoll_slowinggcf, PhysTest.tag_ccoll_slowinggca
-                    ]:
-            self._activateinputs(tag)
-            self._runascot(tag)
+        self._runascot([
+            PhysTest.tag_ccoll_thermalgo, PhysTest.tag_ccoll_thermalgcf,
+            PhysTest.tag_ccoll_thermalgca, PhysTest.tag_ccoll_slowinggo,
+            PhysTest.tag_ccoll_slowinggcf, PhysTest.tag_ccoll_slowinggca],
+            shared=PhysTest.tag_ccoll)
 
     def check_ccoll(self):
         """Check Coulomb collision test.
@@ -884,58 +940,59 @@ class PhysTest():
         run_sgcf = self.ascot.data[PhysTest.tag_ccoll_slowinggcf]
         run_sgca = self.ascot.data[PhysTest.tag_ccoll_slowinggca]
 
-        fig = a5plt.figuredoublecolumn()
+        fig = a5plt.figuredoublecolumn(num="ccoll", clear=True)
         gs = GridSpec(2, 2, figure=fig)
         h1 = fig.add_subplot(gs[0,0])
         h2 = fig.add_subplot(gs[0,1])
         h3 = fig.add_subplot(gs[1,0])
         h4 = fig.add_subplot(gs[1,1])
 
-        # Analytical results
-        alphaZ = 2
-        clog   = 16
+        # Analytical results. Plasma and marker parameters are those set in
+        # init_ccoll and the constants are in SI units (energies in eV).
+        alphaZ     = 2
+        clog       = 16
+        Te         = 1e3
+        ne         = 1e20
+        Esd        = 3.5e6
+        simtime_th = 2e-2
+        e, m_e, m_p, m_a = (physlib.e.v, physlib.m_e.v, physlib.m_p.v,
+                            physlib.m_a.v)
+        eps_0      = physlib.eps_0.to("F/m").v
+        THERMAL    = {"Egrid" : np.linspace(0, 10 * Te, 100)}
+        SLOWING    = {"Egrid" : np.linspace(Te, 1.2 * Esd, 200)}
         vth    = np.sqrt(2*Te*e / m_e)
         vcrit  = vth * np.power( (3.0*np.sqrt(np.pi)/4.0) * (m_e / m_p) , 1/3.0)
         Ecrit  = 0.5 * m_a * vcrit * vcrit / e
-        ts     = 3 * np.sqrt( np.power(2*np.pi * Te * e, 3) / m_e ) * eps_0 * eps_0 \
-            * m_a /( alphaZ * alphaZ * np.power(e, 4) * ne * clog)
+        ts     = 3 * np.sqrt( (2*np.pi * Te * e)**3 / m_e ) * eps_0 * eps_0 \
+            * m_a /( alphaZ * alphaZ * e**4 * ne * clog)
 
         heaviside = np.logical_and(SLOWING["Egrid"] <= Esd,
                                    SLOWING["Egrid"] >= 50*Te)
 
+        # Half-integer powers are evaluated with sqrt instead of np.power
         THERMAL["analytical"]  = 2 * np.sqrt(THERMAL["Egrid"]/np.pi) \
-            * np.power(Te,-3.0/2) \
+            / ( Te * np.sqrt(Te) ) \
             * np.exp(-THERMAL["Egrid"]/Te)
         THERMAL["analytical"] *= (simtime_th/2)
+        ecrit = Ecrit / SLOWING["Egrid"]
         SLOWING["analytical"] = heaviside * ts \
-            / ( ( 1 + np.power(Ecrit/SLOWING["Egrid"], 3.0/2) )\
+            / ( ( 1 + ecrit * np.sqrt(ecrit) )\
                 * 2 * SLOWING["Egrid"] )
 
         # ts is slowing down rate which gives the slowing down time as
         # t_sd = ts*log(v_0 / v_th) = 0.5*ts*log(E_0/E_th)
         slowingdowntime = 0.5*ts*np.log(Esd/(50*Te))
 
-        for run in [run_tgo, run_tgcf, run_tgca]:
-            dist = run.getdist("5d", exi=True)
-            edist = dist.integrate(
-                r=np.s_[:], phi=np.s_[:], z=np.s_[:], time=np.s_[:],
-                charge=np.s_[:], pitch=np.s_[:], copy=True)
-            xdist = dist.integrate(
-                r=np.s_[:], phi=np.s_[:], z=np.s_[:], time=np.s_[:],
-                charge=np.s_[:], ekin=np.s_[:], copy=True)
-            run.plotdist(edist, axes=h1)
-            run.plotdist(xdist, axes=h2)
-
-        for run in [run_sgo, run_sgcf, run_sgca]:
+        # The dimensions common to both energy and pitch distributions are
+        # integrated only once per run
+        for run, he, hx in zip(
+                [run_tgo, run_tgcf, run_tgca, run_sgo, run_sgcf, run_sgca],
+                [h1] * 3 + [h3] * 3, [h2] * 3 + [h4] * 3):
             dist = run.getdist("5d", exi=True)
-            edist = dist.integrate(
-                r=np.s_[:], phi=np.s_[:], z=np.s_[:], time=np.s_[:],
-                charge=np.s_[:], pitch=np.s_[:], copy=True)
-            xdist = dist.integrate(
-                r=np.s_[:], phi=np.s_[:], z=np.s_[:], time=np.s_[:],
-                charge=np.s_[:], ekin=np.s_[:], copy=True)
-            run.plotdist(edist, axes=h3)
-            run.plotdist(xdist, axes=h4)
+            dist.integrate(r=np.s_[:], phi=np.s_[:], z=np.s_[:], time=np.s_[:],
+                           charge=np.s_[:])
+            run.plotdist(dist.integrate(pitch=np.s_[:], copy=True), axes=he)
+            run.plotdist(dist.integrate(ekin=np.s_[:],  copy=True), axes=hx)
 
         plt.show()
 
@@ -956,25 +1013,19 @@ class PhysTest():
             "ENDCOND_LIM_SIMTIME" : 5e-6, "ENABLE_ORBIT_FOLLOWING" : 1,
             "ENABLE_COULOMB_COLLISIONS" : 1
         })
-        optgcf = copy.deepcopy(optgo)
-        optgcf.update({
+        optgcf = ChainMap({
             "SIM_MODE" : 2, "FIXEDSTEP_USERDEFINED" : 1e-9
-        })
-        optgca = copy.deepcopy(optgcf)
-        optgca.update({
+        }, optgo)
+        optgca = optgcf.new_child({
             "ENABLE_ADAPTIVE" : 1, "ADAPTIVE_MAX_DRHO" : 0.1,
             "ADAPTIVE_TOL_ORBIT" : 1e-8, "ADAPTIVE_TOL_CCOL" : 1e-1,
             "ADAPTIVE_MAX_DPHI" : 10, "FIXEDSTEP_USERDEFINED" : 1e-8
         })
 
         # Marker input consists of protons
-        mrk = Marker.generate("gc", n=200, species="proton")
-        mrk["r"][:]      = 5.0
-        mrk["phi"][:]    = 0.0
-        mrk["z"][:]      = 0.0
-        mrk["energy"][:] = 1e3
-        mrk["pitch"][:]  = 1.0 - 2.0 * np.random.rand(mrk["n"],)
-        mrk["zeta"][:]   = 2 * np.pi * np.random.rand(mrk["n"],)
+        u = _RNG.random((2, 200))
+        mrk = _build_marker(200, "proton", r=5.0, phi=0.0, z=0.0, energy=1e3,
+                            pitch=1.0 - 2.0 * u[0], zeta=2 * np.pi * u[1])
 
         # Plasma consisting of electrons only to avoid proton-proton collisions
         pls = init("plasma_flat", density=1e22, temperature=1e3, dryrun=True)
@@ -1000,51 +1051,38 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_classical_go):
             warnings.warn("Results already present: Test classical transport")
             return
-        for tag in [PhysTest.tag_classical_go, PhysTest.tag_classical_gcf,
-                    PhysTest.tag_classical_gca]:
-            i = 0
-            while tag + str(i) in self.ascot.data.bfield.ls(show=False):
-                self._activateinputs(tag+str(i))
-                self._runascot(tag+str(i))
-                i += 1
+        tags = [tag + str(i) for tag in [PhysTest.tag_classical_go,
+                                         PhysTest.tag_classical_gcf,
+                                         PhysTest.tag_classical_gca]
+                for i in range(self._nscan(tag))]
+        self._runascot(tags)
 
     def check_classical(self):
         """Check classical transport test.
         """
-        nscan = 0
-        while PhysTest.tag_classical_go + str(nscan) in \
-              self.ascot.data.bfield.ls(show=False):
-            nscan += 1
+        nscan = self._nscan(PhysTest.tag_classical_go)
 
         # Initialize plots
-        fig = a5plt.figuredoublecolumn(3/2)
+        fig = a5plt.figuredoublecolumn(3/2, num="classical", clear=True)
         ax = fig.add_subplot(1,1,1)
 
         # Numerical values
         ndim = 2 # Diffusion happens on 2D plane
         bnorm = np.zeros((nscan,)) * unyt.T
-        Dgo   = np.zeros((nscan,)) * unyt.m**2 / unyt.s
-        Dgcf  = np.zeros((nscan,)) * unyt.m**2 / unyt.s
-        Dgca  = np.zeros((nscan,)) * unyt.m**2 / unyt.s
+        D     = np.zeros((3, nscan))
         for i in range(nscan):
             run_go  = self.ascot.data[PhysTest.tag_classical_go  + str(i)]
             run_gcf = self.ascot.data[PhysTest.tag_classical_gcf + str(i)]
             run_gca = self.ascot.data[PhysTest.tag_classical_gca + str(i)]
 
-            yi, zi, ti = run_go.getstate("y", "z", "mileage", state="ini")
-            yf, zf, tf = run_go.getstate("y", "z", "mileage", state="end")
-            Dgo[i] = np.mean( ( (yi - yf)**2 + (zi - zf)**2 ) / (tf - ti) ) \
-                / (2*ndim)
-            yi, zi, ti = run_gcf.getstate("y", "z", "mileage", state="ini")
-            yf, zf, tf = run_gcf.getstate("y", "z", "mileage", state="end")
-            Dgcf[i] = np.mean( ( (yi - yf)**2 + (zi - zf)**2 ) / (tf - ti) ) \
-                / (2*ndim)
-            yi, zi, ti = run_gca.getstate("y", "z", "mileage", state="ini")
-            yf, zf, tf = run_gca.getstate("y", "z", "mileage", state="end")
-            Dgca[i] = np.mean( ( (yi - yf)**2 + (zi - zf)**2 ) / (tf - ti) ) \
-                / (2*ndim)
+            # Change in y, z, and mileage for all runs at once
+            states = _collect_states([run_go, run_gcf, run_gca],
+                                     "y", "z", "mileage")
+            dy, dz, dt = np.moveaxis(states[:,1] - states[:,0], 1, 0)
+            D[:,i] = np.mean( ( dy**2 + dz**2 ) / dt, axis=-1 ) / (2*ndim)
 
             bnorm[i] = np.sqrt(np.sum(run_go.bfield.read()["bxyz"]**2))
+        Dgo, Dgcf, Dgca = D * _M2_S
 
         # Analytical
         clog = 13.4
@@ -1083,51 +1121,42 @@ class PhysTest():
             "FIXEDSTEP_USERDEFINED" : 3e-10, "ENDCOND_SIMTIMELIM" : 1,
             "ENABLE_ORBIT_FOLLOWING" : 1, "ENABLE_COULOMB_COLLISIONS" : 1
         })
-        optgcf = copy.deepcopy(optgo)
-        optgcf.update({
+        optgcf = ChainMap({
             "SIM_MODE" : 2
-        })
-        optgca = copy.deepcopy(optgcf)
-        optgca.update({
+        }, optgo)
+        optgca = optgcf.new_child({
             "ENABLE_ADAPTIVE" : 1, "ADAPTIVE_MAX_DRHO" : 0.1,
             "ADAPTIVE_TOL_ORBIT" : 1e-8, "ADAPTIVE_TOL_CCOL" : 1e-1,
             "ADAPTIVE_MAX_DPHI" : 10, "FIXEDSTEP_USERDEFINED" : 1e-10
         })
 
         # Marker input consists of electrons
-        mrk = Marker.generate("gc", n=100, species="electron")
-        mrk["r"][:]      = 7.2
-        mrk["phi"][:]    = 0.0
-        mrk["z"][:]      = 0.0
-        mrk["energy"][:] = 1e3
-        mrk["pitch"][:]  = 1.0 - 2.0 * np.random.rand(mrk["n"],)
-        mrk["zeta"][:]   = 2 * np.pi * np.random.rand(mrk["n"],)
+        u = _RNG.random((2, 100))
+        mrk = _build_marker(100, "electron", r=7.2, phi=0.0, z=0.0, energy=1e3,
+                            pitch=1.0 - 2.0 * u[0], zeta=2 * np.pi * u[1])
 
         # Plasma consisting of protons only to avoid e-e collisions
         pls = init("plasma_flat", temperature=1e3, dryrun=True)
         pls["edensity"][:] = 1
 
+        # Magnetic field is just some tokamak
+        b = init("bfield_analytical_iter_circular", dryrun=True)
+
         for i in range(ni.size):
 
             # Adjust simulation time and time step as the density changes
             # (otherwise simulations with low density would take very long)
             simtime = np.maximum( 5e-4, 4e-2 / ( ni[i-1] / ni[0] ) )
-            optgo.update({
-                "ENDCOND_LIM_SIMTIME" : simtime,
-                "FIXEDSTEP_USERDEFINED" :
-                np.minimum( 2e-9, 3e-10 / ( ni[i-1] / ni[-1] ) )
-            })
-            optgcf.update({
-                "ENDCOND_LIM_SIMTIME" : simtime,
-                "FIXEDSTEP_USERDEFINED" :
-                np.minimum( 2e-8, 5e-10 / ( ni[i-1] / ni[-1] ) )
-            })
-            optgca.update({
-                "ENDCOND_LIM_SIMTIME" : simtime
-            })
-            init("opt", **optgo,  desc=PhysTest.tag_neoclassical_go  + str(i))
-            init("opt", **optgcf, desc=PhysTest.tag_neoclassical_gcf + str(i))
-            init("opt", **optgca, desc=PhysTest.tag_neoclassical_gca + str(i))
+            dtgo  = np.minimum( 2e-9, 3e-10 / ( ni[i-1] / ni[-1] ) )
+            dtgcf = np.minimum( 2e-8, 5e-10 / ( ni[i-1] / ni[-1] ) )
+            init("opt", desc=PhysTest.tag_neoclassical_go  + str(i),
+                 **ChainMap({"ENDCOND_LIM_SIMTIME" : simtime,
+                             "FIXEDSTEP_USERDEFINED" : dtgo}, optgo))
+            init("opt", desc=PhysTest.tag_neoclassical_gcf + str(i),
+                 **ChainMap({"ENDCOND_LIM_SIMTIME" : simtime,
+                             "FIXEDSTEP_USERDEFINED" : dtgcf}, optgcf))
+            init("opt", desc=PhysTest.tag_neoclassical_gca + str(i),
+                 **optgca.new_child({"ENDCOND_LIM_SIMTIME" : simtime}))
 
             pls["idensity"][:] = ni[i]
             for tag in [PhysTest.tag_neoclassical_go,
@@ -1135,7 +1164,7 @@ class PhysTest():
                         PhysTest.tag_neoclassical_gca]:
                 init("gc", **mrk, desc=tag + str(i))
                 init("plasma_1D", **pls, desc=tag + str(i))
-                init("bfield_analytical_iter_circular", desc=tag + str(i))
+                init("B_GS", **b, desc=tag + str(i))
 
     def run_neoclassical(self):
         """Run neoclassical transport test.
@@ -1143,23 +1172,16 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_neoclassical_go):
             warnings.warn("Results already present: Test neoclass. transport")
             return
-        for tag in [PhysTest.tag_neoclassical_go, PhysTest.tag_neoclassical_gcf,
-                    PhysTest.tag_neoclassical_gca]:
-            i = 0
-            while tag + str(i) in self.ascot.data.bfield.ls(show=False):
-                print(i)
-                self._activateinputs(tag+str(i))
-                self._runascot(tag+str(i))
-                i += 1
+        tags = [tag + str(i) for tag in [PhysTest.tag_neoclassical_go,
+                                         PhysTest.tag_neoclassical_gcf,
+                                         PhysTest.tag_neoclassical_gca]
+                for i in range(self._nscan(tag))]
+        self._runascot(tags)
 
     def check_neoclassical(self):
         """Check neoclassical transport test.
         """
-        nscan = 0
-        items = self.ascot.data.bfield.ls(show=False)
-        while PhysTest.tag_neoclassical_go + str(nscan) in items:
-            nscan += 1
-            print(nscan)
+        nscan = self._nscan(PhysTest.tag_neoclassical_go)
 
         # Evaluate Ti and R_omp(rho) as these are needed
         run_go = self.ascot.data[PhysTest.tag_neoclassical_go  + "0"]
@@ -1170,40 +1192,29 @@ class PhysTest():
         self.ascot.input_free()
 
         # Initialize plots
-        fig = a5plt.figuredoublecolumn(3/2)
+        fig = a5plt.figuredoublecolumn(3/2, num="neoclassical", clear=True)
         ax = fig.add_subplot(1,1,1)
         ax.set_xscale("log")
         ax.set_yscale("log")
 
         # Numerical values
-        ni    = np.zeros((nscan,)) / unyt.m**3
-        Dgo   = np.zeros((nscan,)) * unyt.m**2 / unyt.s
-        Dgcf  = np.zeros((nscan,)) * unyt.m**2 / unyt.s
-        Dgca  = np.zeros((nscan,)) * unyt.m**2 / unyt.s
+        ni    = np.zeros((nscan,)) * _INV_M3
+        D     = np.zeros((3, nscan))
         for i in range(nscan):
             run_go  = self.ascot.data[PhysTest.tag_neoclassical_go  + str(i)]
             run_gcf = self.ascot.data[PhysTest.tag_neoclassical_gcf + str(i)]
             run_gca = self.ascot.data[PhysTest.tag_neoclassical_gca + str(i)]
 
-            ri, ti = run_go.getstate("rho", "mileage", state="ini")
-            rf, tf = run_go.getstate("rho", "mileage", state="end")
-            ri = np.interp(ri, rhoomp, romp) * unyt.m
-            rf = np.interp(rf, rhoomp, romp) * unyt.m
-            Dgo[i] = 0.5 * np.mean( (rf - ri)**2 / (tf - ti) )
-
-            ri, ti = run_gcf.getstate("rho", "mileage", state="ini")
-            rf, tf = run_gcf.getstate("rho", "mileage", state="end")
-            ri = np.interp(ri, rhoomp, romp) * unyt.m
-            rf = np.interp(rf, rhoomp, romp) * unyt.m
-            Dgcf[i] = 0.5 * np.mean( (rf - ri)**2 / (tf - ti) )
-
-            ri, ti = run_gca.getstate("rho", "mileage", state="ini")
-            rf, tf = run_gca.getstate("rho", "mileage", state="end")
-            ri = np.interp(ri, rhoomp, romp) * unyt.m
-            rf = np.interp(rf, rhoomp, romp) * unyt.m
-            Dgca[i] = 0.5 * np.mean( (rf - ri)**2 / (tf - ti) )
+            # Diffusion coefficient from the change in R_omp for all runs at
+            # once
+            states = _collect_states([run_go, run_gcf, run_gca],
+                                     "rho", "mileage")
+            rmp    = np.interp(states[:,:,0], rhoomp, romp)
+            dt     = states[:,1,1] - states[:,0,1]
+            D[:,i] = 0.5 * np.mean( (rmp[:,1] - rmp[:,0])**2 / dt, axis=-1 )
 
             ni[i] = run_go.plasma.read()["idensity"][0, 0]
+        Dgo, Dgcf, Dgca = D * _M2_S
 
         r0    = run_go.getstate("r")[0]
         axisr = run_go.bfield.read()["raxis"][0] * unyt.m
@@ -1215,24 +1226,21 @@ class PhysTest():
         omegat = physlib.bouncefrequency(unyt.me, ekin, r0, axisr, qfac)
         rhog   = physlib.gyrolength(unyt.me, 1*unyt.e, ekin, 0.0, bnorm).to("m")
 
+        # Collision frequency is evaluated in a single call both for the
+        # analytical curve (density extending a decade beyond the scanned
+        # range) and for the x coordinates of the numerical coefficients
         clog     = 15
-        density  = np.power( 10, np.linspace(np.log10(ni[0]) - 1,
-                                             np.log10(ni[-1]) + 1, 50) ) / unyt.m**3
-        collfreq = physlib.collfreq_ie(unyt.mp, unyt.e, density, Ti, clog) \
-            * ( unyt.mp / unyt.me )
-        veff = collfreq / omegat
+        density  = np.geomspace(ni[0].v / 10, ni[-1].v * 10, 50) * _INV_M3
+        collfreq = physlib.collfreq_ie(
+            unyt.mp, unyt.e, np.concatenate((density, ni)), Ti, clog) * _MP_ME
+        veff, veff_x = np.split(collfreq / omegat, [density.size])
         # Add intermediate values needed for plotting a continuous curve
-        veff = np.append(veff, [1, np.power(eps, 3.0/2.0)])
+        veff = np.append(veff, [1, eps * np.sqrt(eps)])
         veff.sort()
 
         Dps = qfac**2 * veff * omegat * rhog**2 / 2
         Dp  = 0.5 * qfac**2 * omegat * rhog**2 * np.ones(veff.shape)
-        Db  = np.power(eps, -3.0/2.0) * Dps
-
-        # x coordinate for plotting the numerical coefficients
-        collfreq = physlib.collfreq_ie(unyt.mp, unyt.e, ni, Ti, clog) \
-            * ( unyt.mp / unyt.me )
-        veff_x = collfreq / omegat
+        Db  = Dps / ( eps * np.sqrt(eps) )
 
         ax.plot(veff, Dps, color="black")
         ax.plot(veff, Dp, color="black")
@@ -1296,8 +1304,9 @@ class PhysTest():
         rhogrid = np.linspace(mhd["rhomin"], mhd["rhomax"], mhd["nrho"])
         alpha   = np.exp( -(rhogrid-0.85)**2/0.1 )
         phi     = alpha*0
-        mhd["phi"]   = np.tile(phi, (mhd["nmode"],1)).T
-        mhd["alpha"] = np.tile(alpha, (mhd["nmode"],1)).T
+        shape   = (mhd["nrho"], mhd["nmode"])
+        mhd["phi"]   = np.broadcast_to(phi[:,None], shape)
+        mhd["alpha"] = np.broadcast_to(alpha[:,None], shape)
         init("MHD_STAT", **mhd, desc=PhysTest.tag_boozer+"0")
 
     def run_boozer(self):
@@ -1306,9 +1315,7 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_boozer):
             warnings.warn("Results already present: Test Boozer transformation")
             return
-        for i in range(4):
-            self._activateinputs(PhysTest.tag_boozer + str(i))
-            self._runascot(PhysTest.tag_boozer + str(i))
+        self._runascot([PhysTest.tag_boozer + str(i) for i in range(4)])
 
     def check_boozer(self):
         """Check Boozer transformation test.
@@ -1319,7 +1326,7 @@ class PhysTest():
         run4 = self.ascot.data[PhysTest.tag_boozer+"3"]
 
         # Initialize plots
-        fig = a5plt.figuredoublecolumn(3/2)
+        fig = a5plt.figuredoublecolumn(3/2, num="boozer", clear=True)
         ax1 = fig.add_subplot(3,2,1)
         ax2 = fig.add_subplot(3,2,3)
         ax3 = fig.add_subplot(3,2,5)
@@ -1339,8 +1346,16 @@ class PhysTest():
             self.ascot.input_init(run=run.get_qid(), bfield=True, boozer=True,
                                   mhd=True)
             r, phi, z, t, pol = run.getorbit("r", "phi", "z", "time", "theta")
-            theta, zeta, alpha, jacb2 = self.ascot.input_eval(
-                r, phi, z, t, "theta", "zeta", "alphaeig", "bjacxb2")
+
+            # Boozer coordinates, gradients needed for evaluating the magnetic
+            # field from them, and the actual field are evaluated in one call
+            theta, zeta, alpha, jacb2, *grad, br, bphi, bz = \
+                self.ascot.input_eval(
+                    r, phi, z, t, "theta", "zeta", "alphaeig", "bjacxb2",
+                    "dpsidr (bzr)", "dpsidphi (bzr)", "dpsidz (bzr)",
+                    "dthetadr", "dthetadphi", "dthetadz",
+                    "dzetadr", "dzetadphi", "dzetadz", "br", "bphi", "bz")
+            self.ascot.input_free()
 
             # Results are plotted as a function of poloidal angle so find the
             # "discontinuity" points at 0/2pi.
@@ -1348,46 +1363,37 @@ class PhysTest():
             theta = theta.v
             zeta  = zeta.v
 
-            # Numerical safety factor has some noise so evaluate the average
-            dz = np.diff(zeta)
-            dz[dz > np.pi]  = dz[dz > np.pi]  - 2*np.pi
-            dz[dz < -np.pi] = dz[dz < -np.pi] + 2*np.pi
-            dt = np.diff(theta)
-            dt[dt > np.pi]  = dt[dt > np.pi]  - 2*np.pi
-            dt[dt < -np.pi] = dt[dt < -np.pi] + 2*np.pi
+            # Numerical safety factor has some noise so evaluate the average.
+            # Angle increments are wrapped to [-pi, pi).
+            dz = (np.diff(zeta)  + np.pi) % (2*np.pi) - np.pi
+            dt = (np.diff(theta) + np.pi) % (2*np.pi) - np.pi
             qfac = dz/dt
 
-            # Evaluate gradients and field components so we can compare those
-            a, b, c = self.ascot.input_eval(
-                r, phi, z, t, "dpsidr (bzr)", "dpsidphi (bzr)", "dpsidz (bzr)")
-            gradpsi = np.array([a, b/r, c]).T
-            a, b, c = self.ascot.input_eval(
-                r, phi, z, t, "dthetadr", "dthetadphi", "dthetadz")
-            gradtheta = np.array([a, b/r, c]).T
-            a, b, c = self.ascot.input_eval(
-                r, phi, z, t, "dzetadr", "dzetadphi", "dzetadz")
-            gradzeta = np.array([a, b/r, c]).T
-
-            br, bphi, bz = self.ascot.input_eval(
-                r, phi, z, t, "br", "bphi", "bz")
-            self.ascot.input_free()
+            # Gradients of psi, theta, and zeta as (N,3) views of a single
+            # contiguous (N,9) array
+            grads = np.stack([g.v for g in grad], axis=1)
+            grads[:,1::3] /= r.v[:,None]
+            gradpsi, gradtheta, gradzeta = np.split(grads, 3, axis=1)
 
             # Magnetic field vector from Boozer coordinates
             veca = np.cross(gradpsi, gradtheta)
             vecb = np.cross(gradzeta, gradpsi)
             bvec = -veca*np.mean(qfac) - vecb
 
-            idx = np.nonzero(np.abs(np.diff(theta)) > np.pi)[0]
-            dbpol = np.sqrt((bvec[:,0] - br.v)**2 + (bvec[:,2] - bz.v)**2)
-            dbphi = bvec[:,1] - bphi.v
-            bnorm = br**2 + bz**2 + bphi**2
-
-            j0 = 1
-            for j in idx[1:]:
-                ax1.plot(theta[j0:j], dbpol[j0:j], color=colors[i])
-                ax2.plot(theta[j0:j], dbphi[j0:j], color=colors[i])
-                ax3.plot(theta[j0:j], jacb2[j0:j], color=colors[i])
-                j0 = j
+            # Difference to the actual field with poloidal (R,z) components
+            # reduced in a single pass
+            db    = bvec - np.stack([br.v, bphi.v, bz.v], axis=1)
+            dbpol = np.sqrt(np.einsum("ij,ij->i", db[:,::2], db[:,::2]))
+            dbphi = db[:,1]
+
+            # Each quantity is plotted as a single collection of the segments
+            # between the discontinuities
+            bounds = list(zip(np.r_[1, idx[1:-1]], idx[1:]))
+            for ax, y in [(ax1, dbpol), (ax2, dbphi), (ax3, np.asarray(jacb2))]:
+                lines = [np.column_stack([theta[a:b], y[a:b]])
+                         for a, b in bounds]
+                ax.add_collection(LineCollection(lines, colors=colors[i]))
+                ax.autoscale_view()
             if qfac[0] > 0:
                 ax4.plot(qfac, color=colors[i])
             else:
@@ -1410,17 +1416,15 @@ class PhysTest():
             "ENABLE_MHD" : 1, "ENABLE_ORBITWRITE" : 1, "ORBITWRITE_MODE" : 1,
             "ORBITWRITE_INTERVAL" : 1e-7, "ORBITWRITE_NPOINT" : 10000
         })
-        init("opt", **opt, desc=PhysTest.tag_mhd_go)
-        opt.update({
-            "SIM_MODE" : 2, "FIXEDSTEP_USERDEFINED" : 1e-10
+        self._initoptions(opt, {
+            PhysTest.tag_mhd_go  : {},
+            PhysTest.tag_mhd_gcf : {
+                "SIM_MODE" : 2, "FIXEDSTEP_USERDEFINED" : 1e-10},
+            PhysTest.tag_mhd_gca : {
+                "SIM_MODE" : 2, "ENABLE_ADAPTIVE" : 1,
+                "FIXEDSTEP_USERDEFINED" : 1e-11, "ADAPTIVE_TOL_ORBIT" : 1e-10,
+                "ADAPTIVE_MAX_DRHO" : 0.1, "ADAPTIVE_MAX_DPHI" : 10},
         })
-        init("opt", **opt, desc=PhysTest.tag_mhd_gcf)
-        opt.update({
-            "ENABLE_ADAPTIVE" : 1, "FIXEDSTEP_USERDEFINED" : 1e-11,
-            "ADAPTIVE_TOL_ORBIT" : 1e-10, "ADAPTIVE_MAX_DRHO" : 0.1,
-            "ADAPTIVE_MAX_DPHI" : 10
-        })
-        init("opt", **opt, desc=PhysTest.tag_mhd_gca)
 
         # Use field line markers
         mrk = Marker.generate("gc", n=2, species="electron")
@@ -1430,20 +1434,17 @@ class PhysTest():
         mrk["pitch"][:]  = np.array([0.4, 0.9])
         mrk["energy"][:] = 1e6
 
-        # ITER-like field with boozer data and field line markers
-        for tag in [PhysTest.tag_mhd_go, PhysTest.tag_mhd_gcf,
-                    PhysTest.tag_mhd_gca]:
-            qid = init("bfield_analytical_iter_circular", splines=True,
-                       desc=tag)
-            init("gc", **mrk, desc=tag)
+        # ITER-like field with boozer data and field line markers. The field
+        # is converted to splines only once.
+        tags = PhysTest._tags_mhd
+        b = init("bfield_analytical_iter_circular", splines=True, dryrun=True)
+        names = self._initinputs([("B_2DS", tags, b), ("gc", tags, mrk)])
 
-        qid = self.ascot.data.bfield[qid].get_qid()
+        qid = self.ascot.data.bfield[names[0]].get_qid()
         self.ascot.input_init(bfield=qid)
         bzr = init("boozer_tokamak", dryrun=True)
         self.ascot.input_free(bfield=True)
-        for tag in [PhysTest.tag_mhd_go, PhysTest.tag_mhd_gcf,
-                    PhysTest.tag_mhd_gca]:
-            init("Boozer", **bzr, desc=tag)
+        self._initinputs([("Boozer", tags, bzr)])
 
     def run_mhd(self):
         """Run MHD test.
@@ -1451,10 +1452,7 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_mhd_go):
             warnings.warn("Results already present: Test MHD")
             return
-        for tag in [PhysTest.tag_mhd_go, PhysTest.tag_mhd_gcf,
-                    PhysTest.tag_mhd_gca]:
-            self._activateinputs(tag)
-            self._runascot(tag)
+        self._runascot(PhysTest._tags_mhd)
 
     def check_mhd(self):
         """Check MHD test.
@@ -1469,56 +1467,43 @@ class PhysTest():
         if hasattr(self.ascot.data.options, PhysTest.tag_atomic_cx):
             warnings.warn("Inputs already present: Test atomic reaction")
             return
-        init = self.ascot.data.create_input
 
         # Options
         opt = Opt.get_default()
         opt.update({
             "SIM_MODE" : 1, "FIXEDSTEP_USE_USERDEFINED" : 1,
             "ENDCOND_SIMTIMELIM" : 1, "ENDCOND_LIM_SIMTIME" : 1e-3, # 1e-3
-            "ENABLE_ORBIT_FOLLOWING" : 1, "ENABLE_ATOMIC" : 1
-        })
-        opt.update({
-            "FIXEDSTEP_USERDEFINED" : 1e-9, "ENDCOND_NEUTRALIZED" : 1
+            "ENABLE_ORBIT_FOLLOWING" : 1, "ENABLE_ATOMIC" : 1,
+            "FIXEDSTEP_USERDEFINED" : 1e-9
         })
-        init("opt", **opt, desc=PhysTest.tag_atomic_ionz)
-        opt.update({
-            "FIXEDSTEP_USERDEFINED" : 1e-9, "ENDCOND_NEUTRALIZED" : 0,#1e-13
-            "ENDCOND_IONIZED" : 1
+        self._initoptions(opt, {
+            PhysTest.tag_atomic_ionz : {"ENDCOND_NEUTRALIZED" : 1},
+            PhysTest.tag_atomic_cx   : {"ENDCOND_NEUTRALIZED" : 0,#1e-13
+                                        "ENDCOND_IONIZED" : 1},
         })
-        init("opt", **opt, desc=PhysTest.tag_atomic_cx)
-
-        mrk = Marker.generate("gc", n=100, species="deuterium")
-        mrk["r"][:]      = 7.0
-        mrk["phi"][:]    = 0.0
-        mrk["z"][:]      = 0.0
-        mrk["zeta"][:]   = 2 * np.pi * np.random.rand(mrk["n"],)
-        mrk["energy"][:] = 1e5
-        mrk["pitch"][:]  = 1.0 - 2.0 * np.random.rand(mrk["n"],)
-        init("gc", **mrk, desc=PhysTest.tag_atomic_cx)
-
-        mrk = Marker.generate("gc", n=100, species="deuterium")
-        mrk["charge"][:] = 0
-        mrk["r"][:]      = 7.0
-        mrk["phi"][:]    = 0.0
-        mrk["z"][:]      = 0.0
-        mrk["zeta"][:]   = 1.0 - 2.0 * np.random.rand(mrk["n"],)
-        mrk["energy"][:] = 1e5
-        mrk["pitch"][:]  = 2 * np.pi * np.random.rand(mrk["n"],)
-        init("gc", **mrk, desc=PhysTest.tag_atomic_ionz)
-
-        for tag in [PhysTest.tag_atomic_cx, PhysTest.tag_atomic_ionz]:
-            # Some tokamak magnetic field
-            init("bfield_analytical_iter_circular", desc=tag)
 
+        u = _RNG.random((4, 100))
+        mrk = _build_marker(100, "deuterium", r=7.0, phi=0.0, z=0.0,
+                            zeta=2 * np.pi * u[0], energy=1e5,
+                            pitch=1.0 - 2.0 * u[1])
+        # Markers for the ionization test are neutral but otherwise differ only
+        # by their random angles, so the other arrays are shared
+        mrkionz = dict(mrk, charge=np.zeros_like(mrk["charge"]),
+                       zeta=2 * np.pi * u[2], pitch=1.0 - 2.0 * u[3])
+        tags = PhysTest._tags_atomic
+        self._initinputs([
+            ("gc", PhysTest.tag_atomic_cx,   mrk),
+            ("gc", PhysTest.tag_atomic_ionz, mrkionz),
+            # Some tokamak magnetic field
+            ("bfield_analytical_iter_circular", tags, {}),
             # Plasma and neutral data
-            init("plasma_flat", anum=2, znum=1, mass=2.0135532,
-                 density=1e20, temperature=1e3, desc=tag)
-            init("neutral_flat", anum=2, znum=1, density=1e16, temperature=1e3,
-                 desc=tag)
-
+            ("plasma_flat", tags, {"anum" : 2, "znum" : 1, "mass" : 2.0135532,
+                                   "density" : 1e20, "temperature" : 1e3}),
+            ("neutral_flat", tags, {"anum" : 2, "znum" : 1, "density" : 1e16,
+                                    "temperature" : 1e3}),
             # ADAS data
-            init("import_adas", desc=tag)
+            ("import_adas", tags, {}),
+        ])
 
     def run_atomic(self):
         """Run atomic reaction test.
@@ -1526,9 +1511,7 @@ class PhysTest():
         if hasattr(self.ascot.data, PhysTest.tag_atomic_cx):
             warnings.warn("Results already present: Test atomic reaction")
             return
-        for tag in [PhysTest.tag_atomic_cx, PhysTest.tag_atomic_ionz]:
-            self._activateinputs(tag)
-            self._runascot(tag)
+        self._runascot(PhysTest._tags_atomic)
 
     def check_atomic(self):
         """Check atomic reaction test.
@@ -1536,33 +1519,223 @@ class PhysTest():
         run_cx   = self.ascot.data[PhysTest.tag_atomic_cx]
         run_ionz = self.ascot.data[PhysTest.tag_atomic_ionz]
 
-    def _activateinputs(self, tag):
+    def _inputqids(self, tag, shared=None):
+        """Return command line arguments that choose the inputs for a test.
+
+        The input with the given tag is used if present, then the input with
+        the ``shared`` tag (inputs common to several simulations of a test),
+        and "DUMMY" otherwise.
+        """
         data = self.ascot.data
-        tag0 = tag if hasattr(data.bfield, tag) else "DUMMY"
-        data.bfield[tag0].activate()
-        tag0 = tag if hasattr(data.efield, tag) else "DUMMY"
-        data.efield[tag0].activate()
-        tag0 = tag if hasattr(data.wall, tag) else "DUMMY"
-        data.wall[tag0].activate()
-        tag0 = tag if hasattr(data.plasma, tag) else "DUMMY"
-        data.plasma[tag0].activate()
-        tag0 = tag if hasattr(data.neutral, tag) else "DUMMY"
-        data.neutral[tag0].activate()
-        tag0 = tag if hasattr(data.boozer, tag) else "DUMMY"
-        data.boozer[tag0].activate()
-        tag0 = tag if hasattr(data.mhd, tag) else "DUMMY"
-        data.mhd[tag0].activate()
-        tag0 = tag if hasattr(data.asigma, tag) else "DUMMY"
-        data.asigma[tag0].activate()
-        tag0 = tag if hasattr(data.options, tag) else "DUMMY"
-        data.options[tag0].activate()
-        tag0 = tag if hasattr(data.marker, tag) else "DUMMY"
-        data.marker[tag0].activate()
-
-    def _runascot(self, test):
-        subprocess.call(["./ascot5_main", "--in=testascot.h5", "--d="+test],
-                        stdout=subprocess.DEVNULL)
-        self.ascot = Ascot(self.ascot.file_getpath())
+        tags = [t for t in (tag, shared, "DUMMY") if t is not None]
+        args = []
+        for parent in _INPUTS:
+            group = getattr(data, parent)
+            inp   = next(g for g in (getattr(group, t, None) for t in tags)
+                         if g is not None)
+            args.append("--" + parent + "=" + inp.get_qid())
+        return args
+
+    def _initoptions(self, base, deltas):
+        """Write options for several tests at once.
+
+        The data tree is updated only once after all options are written.
+
+        Parameters
+        ----------
+        base : dict
+            Options that are common to all tests.
+        deltas : dict [str, dict]
+            Tag of each test and the options where it differs from the base.
+        """
+        self._initinputs([("opt", tag, ChainMap(delta, base))
+                          for tag, delta in deltas.items()])
+
+    def _initinputs(self, inputs):
+        """Write several inputs at once.
+
+        Unlike :meth:`create_input`, which rebuilds the data tree after every
+        input, the data tree is updated only once after all inputs are written.
+
+        An input that is used by several tests is constructed and written only
+        once, and the HDF5 group is then copied under a new QID for the other
+        tags.
+
+        Parameters
+        ----------
+        inputs : list [(str, str or list [str], dict)]
+            Type or template of each input as in :meth:`create_input`, the
+            tag(s) it is written with, and the parameters of the type or
+            template.
+
+        Returns
+        -------
+        names : list [str]
+            Names, i.e. "<type>_<qid>", of the inputs written with the first
+            tag of each entry.
+        """
+        fn      = self.ascot.file_getpath()
+        factory = InputFactory(self.ascot)
+        names   = []
+        copies  = []
+        for inp, tags, kwargs in inputs:
+            tags = [tags] if isinstance(tags, str) else tags
+            if inp not in HDF5TOOBJ:
+                inp, kwargs = factory.construct(inp, **kwargs)
+            name = HDF5TOOBJ[inp].write_hdf5(fn, desc=tags[0], **kwargs)
+            names.append(name)
+            copies += [(name, tag) for tag in tags[1:]]
+        if copies:
+            with h5py.File(fn, "a") as h5:
+                for name, tag in copies:
+                    grp = fileapi.copy_group(h5, h5, name, newgroup=True)
+                    fileapi.set_desc(h5, grp, tag)
+        self.ascot.data._build(fn)
+        return names
+
+    def _nscan(self, tag):
+        """Return the number of scan points, i.e. inputs tagged tag0, tag1, ...
+
+        The tags are looked up directly from the bfield node instead of
+        searching them from the string listing all inputs.
+        """
+        bfield = self.ascot.data.bfield
+        nscan  = 0
+        while tag + str(nscan) in bfield:
+            nscan += 1
+        return nscan
+
+    def _getorbit(self, run, *qnt, ids=None, raw=False):
+        """Return orbit data of a run reading it only once per test.
+
+        The quantities are read for all markers on the first call and cached
+        by the run QID, so that subsequent calls only pick the given marker.
+        The data is sorted by marker ID, so the returned arrays are views to
+        the contiguous block of the cached data; do not modify them in place.
+
+        With ``raw=True`` the quantities are read directly from the orbit
+        datasets as plain arrays in the units they are stored in. This skips
+        the evaluation in :meth:`getorbit` but works only for quantities that
+        are stored in the file, e.g. "mileage", "r", or "z". The data is
+        sorted the same way as it would be by :meth:`getorbit`.
+        """
+        key = (run.get_qid(), raw) + qnt
+        if key not in self._orbitcache and raw:
+            with run._orbit as h5:
+                data = [h5[q][:].ravel() for q in ("ids", "mileage") + qnt]
+            idx = Orbits._sortindices(data[0], data[1])
+            self._orbitcache[key] = [data[0][idx]] + [d[idx] for d in data[2:]]
+        elif key not in self._orbitcache:
+            self._orbitcache[key] = run.getorbit("ids", *qnt)
+        data = self._orbitcache[key]
+        if ids is None:
+            out = data[1:]
+        else:
+            sortedids = np.asarray(data[0])
+            idx = slice(sortedids.searchsorted(ids, "left"),
+                        sortedids.searchsorted(ids, "right"))
+            out = [d[idx] for d in data[1:]]
+        return out if len(out) > 1 else out[0]
+
+    def _runascot(self, tests, shared=None):
+        """Run simulations for the given tags.
+
+        Inputs are chosen via command line so they don't have to be activated
+        in the file before each run, and the file is reopened only once after
+        all simulations are complete. The simulations are run one after
+        another since they all write to the same file, unless more than one
+        process was requested in :meth:`execute`. In that case the simulations
+        are run in parallel, each writing to its own output file, and the
+        results are copied to the test file once all simulations are complete.
+        Inputs without the test's own tag are taken from the ``shared`` tag if
+        given.
+
+        Raises
+        ------
+        RuntimeError
+            If a simulation fails or does not produce output.
+        """
+        if isinstance(tests, str): tests = [tests]
+        fn   = self.ascot.file_getpath()
+        cmds = [["./ascot5_main", "--in=testascot.h5", "--d="+test]
+                + self._inputqids(test, shared) for test in tests]
+        helpers.run_ascot5(fn, tests, cmds, self._nproc)
+        self.ascot = Ascot(fn)
+
+def _build_marker(n, species, **cols):
+    """Generate guiding center markers and fill the given columns.
+
+    Parameters
+    ----------
+    n : int
+        Number of markers.
+    species : str
+        Marker species.
+    **cols
+        Marker quantities, e.g. ``r=5`` or ``pitch=[0.4, 0.9]``, which are
+        broadcast to all markers.
+
+    Returns
+    -------
+    mrk : dict
+        Marker data that can be supplied to :meth:`GC.write_hdf5`.
+    """
+    mrk = Marker.generate("gc", n=n, species=species)
+    for key, val in cols.items():
+        mrk[key][:] = val
+    return mrk
+
+def _collect_states(runs, *qnt):
+    """Collect marker quantities at ini- and endstate of several runs.
+
+    Parameters
+    ----------
+    runs : list [:class:`RunGroup`]
+        Runs with equal number of markers.
+    *qnt : str
+        Names of the quantities.
+
+    Returns
+    -------
+    states : array_like, (nrun, 2, nqnt, nmrk)
+        The quantities of each marker at the inistate (index 0) and endstate
+        (index 1) of each run as a plain float array in the units returned by
+        :meth:`getstate`.
+    """
+    states = []
+    for run in runs:
+        ini = run.getstate(*qnt, state="ini")
+        end = run.getstate(*qnt, state="end")
+        states.append(np.reshape([ini, end], (2, len(qnt), -1)))
+    return np.array(states)
+
+def _check(fn, test):
+    """Check a single test in a separate process.
+
+    The figures are drawn with the non-interactive Agg backend so that the
+    checks calling :func:`plt.show` do not open windows in the worker process.
+
+    Parameters
+    ----------
+    fn : str
+        Path to the test file.
+    test : str
+        Name of the test.
+
+    Returns
+    -------
+    passed : bool
+        Value returned by the check.
+    figs : list [:class:`matplotlib.figure.Figure`]
+        Figures created by the check which are returned (pickled) to the
+        parent process where they are restored to pyplot.
+    """
+    # Figures inherited from the parent process are not part of this check
+    plt.close("all")
+    plt.switch_backend("Agg")
+    a5plt.setpaperstyle()
+    passed = getattr(PhysTest(fn), "check_" + test)()
+    return passed, [plt.figure(i) for i in plt.get_fignums()]
 
 if __name__ == '__main__':
     test = PhysTest()
@@ -25,6 +25,8 @@ File: test_elementary.py
 
 import sys
 
+from functools import lru_cache
+
 import numpy                   as np
 import matplotlib.pyplot       as plt
 import unyt
@@ -46,6 +48,10 @@ import a5py.testascot.helpers as helpers
 from a5py.ascot5io.ascot5 import Ascot
 from a5py.physlib import e, m_e, c
 
+## Points on a unit circle used to plot the analytical gyro-orbit
+_THETA = np.linspace(0, 2*np.pi, 360)
+_SIN, _COS = np.sin(_THETA), np.cos(_THETA)
+
 def init():
     """
     Initialize tests
@@ -141,21 +147,10 @@ def init():
     zeta   = 0       * np.array([1, 1])
     energy = 100e6   * np.array([1, 1])
     pitch  = 0.5     * np.array([1, 1])
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="GYROMOTION")
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="EXB_GO")
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="EXB_GC")
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="GRADB_GO")
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="GRADB_GC")
+    for tname in ["GYROMOTION", "EXB_GO", "EXB_GC", "GRADB_GO", "GRADB_GC"]:
+        mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
+                       R, phi, z, energy, pitch, zeta,
+                       anum, znum, weight, time, desc=tname)
 
     #**************************************************************************#
     #*             Magnetic and electric fields for GYROMOTION                 #
@@ -176,12 +171,10 @@ def init():
     Bxyz   = np.array([5, 0, 0])
     gradB  = np.array([0,0,0,0,0,0,0,0,0])
     rhoval = 1.5
-    B_TC.write_hdf5(helpers.testfn, Bxyz, gradB, rhoval, desc="EXB_GO")
-    B_TC.write_hdf5(helpers.testfn, Bxyz, gradB, rhoval, desc="EXB_GC")
-
     Exyz   = np.array([0, 1e6, 0])
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="EXB_GO")
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="EXB_GC")
+    for tname in ["EXB_GO", "EXB_GC"]:
+        B_TC.write_hdf5(helpers.testfn, Bxyz, gradB, rhoval, desc=tname)
+        E_TC.write_hdf5(helpers.testfn, Exyz, desc=tname)
 
     #**************************************************************************#
     #*           Magnetic and electric fields for GRADB-GO and GRADB-GC        #
@@ -190,12 +183,10 @@ def init():
     Bxyz   = np.array([5, 0, 0])
     gradB  = np.array([0,0,0.1,0,0,0,0,0,0])
     rhoval = 1.5
-    B_TC.write_hdf5(helpers.testfn, Bxyz, gradB, rhoval, desc="GRADB_GO")
-    B_TC.write_hdf5(helpers.testfn, Bxyz, gradB, rhoval, desc="GRADB_GC")
-
     Exyz   = np.array([0, 0, 0])
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="GRADB_GO")
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="GRADB_GC")
+    for tname in ["GRADB_GO", "GRADB_GC"]:
+        B_TC.write_hdf5(helpers.testfn, Bxyz, gradB, rhoval, desc=tname)
+        E_TC.write_hdf5(helpers.testfn, Exyz, desc=tname)
 
     #**************************************************************************#
     #*              Other inputs are trivial and same for all tests            #
@@ -204,12 +195,6 @@ def init():
     nwall = 4
     Rwall = np.array([0.1, 100, 100, 0.1])
     zwall = np.array([-100, -100, 100, 100])
-    for tname in ["GYROMOTION", "EXB_GO", "EXB_GC", "GRADB_GO", "GRADB_GC"]:
-        W_2D.write_hdf5(helpers.testfn, nwall, Rwall, zwall, desc=tname)
-        N0_3D.write_hdf5_dummy(helpers.testfn, desc=tname)
-        boozer.write_hdf5_dummy(helpers.testfn, desc=tname)
-        mhd.write_hdf5_dummy(helpers.testfn, desc=tname)
-        asigma_loc.write_hdf5_empty(helpers.testfn, desc=tname)
 
     Nrho   = 3
     Nion   = 1
@@ -222,23 +207,21 @@ def init():
     etemp  = 1e3  * np.ones(rho.shape)
     idens  = 1e20 * np.ones((rho.size, Nion))
     itemp  = 1e3  * np.ones(rho.shape)
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="GYROMOTION")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="EXB_GO")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="EXB_GC")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="GRADB_GO")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="GRADB_GC")
+    for tname in ["GYROMOTION", "EXB_GO", "EXB_GC", "GRADB_GO", "GRADB_GC"]:
+        W_2D.write_hdf5(helpers.testfn, nwall, Rwall, zwall, desc=tname)
+        N0_3D.write_hdf5_dummy(helpers.testfn, desc=tname)
+        boozer.write_hdf5_dummy(helpers.testfn, desc=tname)
+        mhd.write_hdf5_dummy(helpers.testfn, desc=tname)
+        asigma_loc.write_hdf5_empty(helpers.testfn, desc=tname)
+        P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge,
+                        rho, edens, etemp, idens, itemp, desc=tname)
 
 def run():
     """
     Run tests.
     """
-    for test in ["GYROMOTION", "EXB_GO", "EXB_GC", "GRADB_GO", "GRADB_GC"]:
-        helpers.set_and_run(test)
+    helpers.run_parallel(["GYROMOTION", "EXB_GO", "EXB_GC", "GRADB_GO",
+                          "GRADB_GC"])
 
 def check():
     """
@@ -296,24 +279,23 @@ def check():
     # Analytical values
     rhog   = gamma * np.sqrt(1 - 0.5 * 0.5) * m_e * v / (B * e)
     omegag = (unyt.kg / unyt.C)*e * B / ( gamma * m_e)
-    m = unyt.m
 
-    # Numerical values
-    ang  = GYROMOTION["GO"]["phi"] * np.pi / 180
+    # Numerical values (the marker mask is evaluated only once)
     igo  = GYROMOTION["GO"]["id"]
     x    = GYROMOTION["GO"]["y"].v
     y    = GYROMOTION["GO"]["z"].v
-    time = GYROMOTION["GO"]["time"][igo==1]
+    i1   = igo == 1
+    time = GYROMOTION["GO"]["time"][i1]
+    x1   = x[i1]
 
-    rho   = np.max( np.sqrt((x-5)**2 + y**2) )
-    zero_crossings = np.where(np.diff(np.sign(x[igo==1])))[0].size
+    rho   = np.max( np.hypot(x-5, y) )
+    zero_crossings = np.count_nonzero(np.sign(x1[1:]) != np.sign(x1[:-1]))
     omega = zero_crossings * np.pi * 2 / time[-1]
 
     # Plot
-    h1.plot(x[igo==1] - 5, y[igo==1], linewidth=3)
-    h1.plot(rhog * np.sin(np.linspace(0,2*np.pi,360)),
-            rhog * np.cos(np.linspace(0,2*np.pi,360)), linestyle="--",
-            color="black", alpha=0.7)
+    h1.plot(x1 - 5, y[i1], linewidth=3)
+    h1.plot(rhog * _SIN, rhog * _COS, linestyle="--", color="black",
+            alpha=0.7)
 
     #**************************************************************************#
     #*                           Check EXB                                     #
@@ -323,37 +305,36 @@ def check():
     # Analytical values
     v_ExB = E * B / (B*B)
 
-    # Numerical values
-    ang = EXB["GO"]["phi"] * np.pi / 180
+    # Numerical values (coordinates as plain arrays in meters)
     igo = EXB["GO"]["id"]
-    xgo = EXB["GO"]["y"] / m
-    ygo = EXB["GO"]["z"] / m
+    xgo = EXB["GO"]["y"].to_value("m")
+    ygo = EXB["GO"]["z"].to_value("m")
 
     igo0  = a5["EXB_GO"]["inistate"]["id"]
     time  = a5["EXB_GO"]["endstate"]["time"]
-    ang   = a5["EXB_GO"]["inistate"]["phi"] * np.pi / 180
-    xgo0  = a5["EXB_GO"]["inistate"]["y"] / m
-    ygo0  = a5["EXB_GO"]["inistate"]["z"] / m
-    ang   = a5["EXB_GO"]["endstate"]["phi"] * np.pi / 180
-    xgo1  = a5["EXB_GO"]["endstate"]["y"] / m
-    ygo1  = a5["EXB_GO"]["endstate"]["z"] / m
-
-    ang = EXB["GC"]["phi"] * np.pi / 180
+    ygo0  = a5["EXB_GO"]["inistate"]["z"].to_value("m")
+    ygo1  = a5["EXB_GO"]["endstate"]["z"].to_value("m")
+
     igc = EXB["GC"]["id"]
-    xgc = EXB["GC"]["y"] / m
-    ygc = EXB["GC"]["z"] / m
+    xgc = EXB["GC"]["y"].to_value("m")
+    ygc = EXB["GC"]["z"].to_value("m")
 
-    vgo1_ExB = ((ygo1[igo0==1] - ygo0[igo0==1]) / (time[igo0==1]))[0]
+    # Drift velocities need only the first and last point of marker 1, so
+    # these are indexed directly instead of masking the whole orbit
+    k        = np.flatnonzero(igo0==1)[0]
+    vgo1_ExB = (ygo1[k] - ygo0[k]) / time[k]
 
-    y          = ygc[igc==1]
-    t          = EXB["GC"]["time"][igc==1]
-    vgc1_ExB = (y[-1] - y[0]) / (t[-1] - t[0])
+    i0, i1   = np.flatnonzero(igc==1)[[0, -1]]
+    t        = EXB["GC"]["time"]
+    vgc1_ExB = (ygc[i1] - ygc[i0]) / (t[i1] - t[i0])
 
     # Plot
-    h2.plot(xgo[igo==1] - 0.07 - 5, ygo[igo==1])
-    h2.plot(xgo[igo==2][1:-1] + 0.07 - 5, ygo[igo==2][1:-1])
-    h2.plot(xgc[igc==1] - 0.07 - 5, ygc[igc==1], color="red")
-    h2.plot(xgc[igc==2] + 0.07 - 5, ygc[igc==2], color="red")
+    go1, go2 = igo==1, igo==2
+    gc1, gc2 = igc==1, igc==2
+    h2.plot(xgo[go1] - 0.07 - 5, ygo[go1])
+    h2.plot(xgo[go2][1:-1] + 0.07 - 5, ygo[go2][1:-1])
+    h2.plot(xgc[gc1] - 0.07 - 5, ygc[gc1], color="red")
+    h2.plot(xgc[gc2] + 0.07 - 5, ygc[gc2], color="red")
 
     #**************************************************************************#
     #*                           Check GRADB                                   #
@@ -365,36 +346,33 @@ def check():
               * gradB * B / (B*B)
 
     # Numerical values
-    ang = GRADB["GO"]["phi"] * np.pi / 180
     igo = GRADB["GO"]["id"]
-    xgo = GRADB["GO"]["y"] / m
-    ygo = GRADB["GO"]["z"] / m
+    xgo = GRADB["GO"]["y"].to_value("m")
+    ygo = GRADB["GO"]["z"].to_value("m")
 
     igo0  = a5["GRADB_GO"]["inistate"]["id"]
     time  = a5["GRADB_GO"]["endstate"]["time"]
-    ang   = a5["GRADB_GO"]["inistate"]["phi"]
-    xgo0  = a5["GRADB_GO"]["inistate"]["y"] / m
-    zgo0  = a5["GRADB_GO"]["inistate"]["z"] / m
-    ang   = a5["GRADB_GO"]["endstate"]["phi"]
-    xgo1  = a5["GRADB_GO"]["endstate"]["y"] / m
-    ygo1  = a5["GRADB_GO"]["endstate"]["z"] / m
-
-    ang = GRADB["GC"]["phi"] * np.pi / 180
+    xgo0  = a5["GRADB_GO"]["inistate"]["y"].to_value("m")
+    xgo1  = a5["GRADB_GO"]["endstate"]["y"].to_value("m")
+
     igc = GRADB["GC"]["id"]
-    xgc = GRADB["GC"]["y"] / m
-    ygc = GRADB["GC"]["z"] / m
+    xgc = GRADB["GC"]["y"].to_value("m")
+    ygc = GRADB["GC"]["z"].to_value("m")
 
-    vgo1_gradB = ((xgo1[igo0==1] - xgo0[igo0==1]) / (time[igo0==1]))[0]
+    k          = np.flatnonzero(igo0==1)[0]
+    vgo1_gradB = (xgo1[k] - xgo0[k]) / time[k]
 
-    x          = xgc[igc==1]
-    t          = GRADB["GC"]["time"][igc==1]
-    vgc1_gradB = (x[-1] - x[0]) / (t[-1] - t[0])
+    i0, i1     = np.flatnonzero(igc==1)[[0, -1]]
+    t          = GRADB["GC"]["time"]
+    vgc1_gradB = (xgc[i1] - xgc[i0]) / (t[i1] - t[i0])
 
     # Plot
-    h3.plot(ygo[igo==1][1:-1] - 0.07, xgo[igo==1][1:-1] - 5)
-    h3.plot(ygo[igo==2] + 0.07, xgo[igo==2] - 5)
-    h3.plot(ygc[igc==1] - 0.07, xgc[igc==1] - 5, color="red")
-    h3.plot(ygc[igc==2] + 0.07, xgc[igc==2] - 5, color="red")
+    go1, go2 = igo==1, igo==2
+    gc1, gc2 = igc==1, igc==2
+    h3.plot(ygo[go1][1:-1] - 0.07, xgo[go1][1:-1] - 5)
+    h3.plot(ygo[go2] + 0.07, xgo[go2] - 5)
+    h3.plot(ygc[gc1] - 0.07, xgc[gc1] - 5, color="red")
+    h3.plot(ygc[gc2] + 0.07, xgc[gc2] - 5, color="red")
 
     # Print analytical values
     text1  = r"$\rho_{g}$ = %2.3f cm" % (rhog*100)
@@ -448,6 +426,11 @@ def check():
     plt.show()
 
 def latex_float(f):
+    # Values may be 0-d arrays (unhashable) so convert before the cached call
+    return _latex_float(float(f))
+
+@lru_cache(maxsize=64)
+def _latex_float(f):
     float_str = "{0:.4g}".format(f)
     if "e" in float_str:
         base, exponent = float_str.split("e")
@@ -42,11 +42,14 @@ File: test_gctransform.py
 """
 import sys
 
+import h5py
 import numpy                   as np
 import unyt
 import matplotlib.pyplot       as plt
 import matplotlib.lines        as mlines
 
+from matplotlib.collections import LineCollection
+
 import a5py.ascot5io.orbits    as orbits
 import a5py.ascot5io.options   as options
 import a5py.ascot5io.B_GS      as B_GS
@@ -62,10 +65,12 @@ import a5py.ascot5io.asigma_loc as asigma_loc
 
 import a5py.testascot.helpers as helpers
 
+from a5py.ascot5io.coreio import fileapi
+
 from a5py.preprocessing.analyticequilibrium import psi0 as psifun
 
 from a5py.ascot5io.ascot5 import Ascot
-from a5py.physlib import e, m_a, c
+from a5py.physlib import m_a, c
 
 psi_mult  = 200
 R0        = 6.2
@@ -173,70 +178,59 @@ def init():
     #**************************************************************************#
     Nmrk   = 1
     ids    = np.array([1])
-    weight = 1       * np.ones(ids.shape)
-    pitch  = 0.4     * np.ones(ids.shape)
+    weight = np.full(Nmrk, 1.0)
+    pitch  = np.full(Nmrk, 0.4)
     mass   = m_a.to("amu") * np.ones(ids.shape)
-    charge = 2       * np.ones(ids.shape)
-    anum   = 4       * np.ones(ids.shape)
-    znum   = 2       * np.ones(ids.shape)
-    time   = 0       * np.ones(ids.shape)
-    R      = 7.6     * np.ones(ids.shape)
-    phi    = 90      * np.ones(ids.shape)
-    z      = 0       * np.ones(ids.shape)
-    zeta   = 2       * np.ones(ids.shape)
-    energy = 3.5e6   * np.ones(ids.shape)
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="GCTRANSFORM_GC")
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="GCTRANSFORM_GO")
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="GCTRANSFORM_GO2GC")
+    charge = np.full(Nmrk, 2.0)
+    anum   = np.full(Nmrk, 4.0)
+    znum   = np.full(Nmrk, 2.0)
+    time   = np.full(Nmrk, 0.0)
+    R      = np.full(Nmrk, 7.6)
+    phi    = np.full(Nmrk, 90.0)
+    z      = np.full(Nmrk, 0.0)
+    zeta   = np.full(Nmrk, 2.0)
+    energy = np.full(Nmrk, 3.5e6)
+    for tname in ["GCTRANSFORM_GC", "GCTRANSFORM_GO", "GCTRANSFORM_GO2GC"]:
+        mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
+                       R, phi, z, energy, pitch, zeta,
+                       anum, znum, weight, time, desc=tname)
 
     #**************************************************************************#
     #*                     Construct ITER-like magnetic field                  #
     #*                                                                         #
     #**************************************************************************#
     Rmin = 4; Rmax = 8.5; nR = 120; zmin = -4; zmax = 4; nz = 200;
-    B_GS.write_hdf5_B_2DS(helpers.testfn, R0, z0, Bphi0, psi_mult, psi_coeff,
-                          Rmin, Rmax, nR, zmin, zmax, nz,
-                          desc="GCTRANSFORM_GC")
-    B_GS.write_hdf5_B_2DS(helpers.testfn, R0, z0, Bphi0, psi_mult, psi_coeff,
-                          Rmin, Rmax, nR, zmin, zmax, nz,
-                          desc="GCTRANSFORM_GO")
-    B_GS.write_hdf5_B_2DS(helpers.testfn, R0, z0, Bphi0, psi_mult, psi_coeff,
-                          Rmin, Rmax, nR, zmin, zmax, nz,
-                          desc="GCTRANSFORM_GO2GC")
-    B_GS.write_hdf5_B_2DS(helpers.testfn, R0, z0, Bphi0, psi_mult, psi_coeff,
-                          Rmin, Rmax, nR, zmin, zmax, nz,
-                          desc="GCTRANSFORM_ZEROTH")
-    B_GS.write_hdf5_B_2DS(helpers.testfn, R0, z0, Bphi0, psi_mult, psi_coeff,
-                          Rmin, Rmax, nR, zmin, zmax, nz,
-                          desc="GCTRANSFORM_FIRST")
+    for tname in ["GCTRANSFORM_GC", "GCTRANSFORM_GO", "GCTRANSFORM_GO2GC",
+                  "GCTRANSFORM_ZEROTH", "GCTRANSFORM_FIRST"]:
+        B_GS.write_hdf5_B_2DS(helpers.testfn, R0, z0, Bphi0, psi_mult,
+                              psi_coeff, Rmin, Rmax, nR, zmin, zmax, nz,
+                              desc=tname)
 
     #**************************************************************************#
     #*                     Rest of the inputs are trivial                      #
     #*                                                                         #
     #**************************************************************************#
     Exyz   = np.array([0, 0, 0])
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="GCTRANSFORM_GC")
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="GCTRANSFORM_GO")
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="GCTRANSFORM_GO2GC")
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="GCTRANSFORM_ZEROTH")
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="GCTRANSFORM_FIRST")
-
     nwall = 4
     Rwall = np.array([0.1, 100, 100, 0.1])
     zwall = np.array([-100, -100, 100, 100])
-    for tname in ["GCTRANSFORM_GC", "GCTRANSFORM_GO", "GCTRANSFORM_GO2GC",
-                  "GCTRANSFORM_ZEROTH", "GCTRANSFORM_FIRST"]:
-        W_2D.write_hdf5(helpers.testfn, nwall, Rwall, zwall, desc=tname)
-        N0_3D.write_hdf5_dummy(helpers.testfn, desc=tname)
-        boozer.write_hdf5_dummy(helpers.testfn, desc=tname)
-        mhd.write_hdf5_dummy(helpers.testfn, desc=tname)
-        asigma_loc.write_hdf5_empty(helpers.testfn, desc=tname)
+    E_TC.write_hdf5(helpers.testfn, Exyz, desc="GCTRANSFORM_GC")
+    W_2D.write_hdf5(helpers.testfn, nwall, Rwall, zwall, desc="GCTRANSFORM_GC")
+    N0_3D.write_hdf5_dummy(helpers.testfn, desc="GCTRANSFORM_GC")
+    boozer.write_hdf5_dummy(helpers.testfn, desc="GCTRANSFORM_GC")
+    mhd.write_hdf5_dummy(helpers.testfn, desc="GCTRANSFORM_GC")
+    asigma_loc.write_hdf5_empty(helpers.testfn, desc="GCTRANSFORM_GC")
+
+    # These inputs are identical in all tests so they are written only once
+    # and then copied for the other tests while the file is kept open
+    with h5py.File(helpers.testfn, "a") as h5:
+        for parent in ["efield", "wall", "neutral", "boozer", "mhd", "asigma"]:
+            grp = [g for g in h5[parent].values()
+                   if fileapi.get_desc(h5, g) == "GCTRANSFORM_GC"][0]
+            for tname in ["GCTRANSFORM_GO", "GCTRANSFORM_GO2GC",
+                          "GCTRANSFORM_ZEROTH", "GCTRANSFORM_FIRST"]:
+                fileapi.set_desc(
+                    h5, fileapi.copy_group(h5, h5, grp, newgroup=True), tname)
 
     Nrho   = 3
     Nion   = 1
@@ -249,16 +243,10 @@ def init():
     etemp  = 1e3  * np.ones(rho.shape)
     idens  = 1e20 * np.ones((rho.size, Nion))
     itemp  = 1e3  * np.ones(rho.shape)
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="GCTRANSFORM_GC")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="GCTRANSFORM_GO")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="GCTRANSFORM_GO2GC")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="GCTRANSFORM_ZEROTH")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="GCTRANSFORM_FIRST")
+    for tname in ["GCTRANSFORM_GC", "GCTRANSFORM_GO", "GCTRANSFORM_GO2GC",
+                  "GCTRANSFORM_ZEROTH", "GCTRANSFORM_FIRST"]:
+        P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge,
+                        rho, edens, etemp, idens, itemp, desc=tname)
 
 def run():
     """
@@ -268,26 +256,28 @@ def run():
     cases, then uses results of GCTRANSFORM_GO to generate markers for
     GCTRANSFORM_ZEROTH and GCTRANSFORM_FIRST which are then run.
     """
-    for test in ["GCTRANSFORM_GC", "GCTRANSFORM_GO", "GCTRANSFORM_GO2GC"]:
-        helpers.set_and_run(test)
+    helpers.set_and_run_many(["GCTRANSFORM_GC", "GCTRANSFORM_GO",
+                              "GCTRANSFORM_GO2GC"])
 
     a5 = Ascot(helpers.testfn)
 
     dt = 20
     Nmrk   = nrep
     ids    = np.linspace(1, Nmrk, Nmrk)
-    weight = 1       * np.ones(ids.shape)
+    weight = np.full(Nmrk, 1.0)
     mass   = m_a.to("amu") * np.ones(ids.shape)
-    charge = 2       * np.ones(ids.shape)
-    znum   = 4       * np.ones(ids.shape)
-    anum   = 2       * np.ones(ids.shape)
-    time   = a5["GCTRANSFORM_GO"]["orbit"]["time"][0:Nmrk*dt:dt]
-    R      = a5["GCTRANSFORM_GO"]["orbit"]["r"][0:Nmrk*dt:dt]
-    phi    = a5["GCTRANSFORM_GO"]["orbit"]["phi"][0:Nmrk*dt:dt]
-    z      = a5["GCTRANSFORM_GO"]["orbit"]["z"][0:Nmrk*dt:dt]
-    vR     = a5["GCTRANSFORM_GO"]["orbit"]["vr"][0:Nmrk*dt:dt]
-    vphi   = a5["GCTRANSFORM_GO"]["orbit"]["vphi"][0:Nmrk*dt:dt]
-    vz     = a5["GCTRANSFORM_GO"]["orbit"]["vz"][0:Nmrk*dt:dt]
+    charge = np.full(Nmrk, 2.0)
+    znum   = np.full(Nmrk, 4.0)
+    anum   = np.full(Nmrk, 2.0)
+    orb    = a5["GCTRANSFORM_GO"]["orbit"]
+    sl     = slice(0, Nmrk*dt, dt)
+    time   = orb["time"][sl]
+    R      = orb["r"][sl]
+    phi    = orb["phi"][sl]
+    z      = orb["z"][sl]
+    vR     = orb["vr"][sl]
+    vphi   = orb["vphi"][sl]
+    vz     = orb["vz"][sl]
     prt.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
                    R, phi, z, vR, vphi, vz,
                    anum, znum, weight, time, desc="GCTRANSFORM_ZEROTH")
@@ -295,9 +285,11 @@ def run():
                    R, phi, z, vR, vphi, vz,
                    anum, znum, weight, time, desc="GCTRANSFORM_FIRST")
 
-    for test in ["GCTRANSFORM_ZEROTH", "GCTRANSFORM_FIRST"]:
-        helpers.set_and_run(test)
+    helpers.set_and_run_many(["GCTRANSFORM_ZEROTH", "GCTRANSFORM_FIRST"])
 
+@plt.rc_context({"xtick.labelsize" : 10, "ytick.labelsize" : 10,
+                 "axes.labelsize" : 10, "mathtext.fontset" : "stix",
+                 "font.family" : "STIXGeneral"})
 def check():
     """
     Plot the results of these tests.
@@ -316,11 +308,6 @@ def check():
     a5 = Ascot(helpers.testfn)
 
     f = plt.figure(figsize=(11.9/2.54, 8/2.54))
-    plt.rc('xtick', labelsize=10)
-    plt.rc('ytick', labelsize=10)
-    plt.rc('axes', labelsize=10)
-    plt.rcParams['mathtext.fontset'] = 'stix'
-    plt.rcParams['font.family'] = 'STIXGeneral'
 
     h1 = f.add_subplot(1,4,1)
     h1.set_position([0.12, 0.58, 0.26, 0.38], which='both')
@@ -339,40 +326,44 @@ def check():
     # and we need to have [:-1]?
     ccyc = plt.rcParams['axes.prop_cycle'].by_key()['color'] # default colors
 
-    h1.plot(a5["GCTRANSFORM_GO"]["orbit"]["time"]*1e6,
-            ( a5["GCTRANSFORM_GO"]["orbit"]["mu"]
-              - a5["GCTRANSFORM_GC"]["orbit"]["mu"] )/e / 1e4 )
-    h1.plot(a5["GCTRANSFORM_GO2GC"]["orbit"]["time"]*1e6,
-            ( a5["GCTRANSFORM_GO2GC"]["orbit"]["mu"]
-              - a5["GCTRANSFORM_GC"]["orbit"]["mu"][:-1] )/e / 1e4 )
-
-    dppar = ( a5["GCTRANSFORM_GO"]["orbit"]["ppar"]
-             - a5["GCTRANSFORM_GC"]["orbit"]["ppar"] )
-    dppar.convert_to_mks()
-    h2.plot(a5["GCTRANSFORM_GO"]["orbit"]["time"]*1e6, dppar / 1e-21 )
-
-    dppar = ( a5["GCTRANSFORM_GO2GC"]["orbit"]["ppar"]
-              - a5["GCTRANSFORM_GC"]["orbit"]["ppar"][:-1] )
-    dppar.convert_to_mks()
-    h2.plot(a5["GCTRANSFORM_GO2GC"]["orbit"]["time"]*1e6, dppar / 1e-21 )
-
-    h3.plot(a5["GCTRANSFORM_GO"]["orbit"]["r"],
-            a5["GCTRANSFORM_GO"]["orbit"]["z"])
-    h3.plot(a5["GCTRANSFORM_GO2GC"]["orbit"]["r"],
-            a5["GCTRANSFORM_GO2GC"]["orbit"]["z"])
-    h3.plot(a5["GCTRANSFORM_GC"]["orbit"]["r"],
-            a5["GCTRANSFORM_GC"]["orbit"]["z"])
-
-    for i in range(0, nrep):
-        id0 = a5["GCTRANSFORM_ZEROTH"]["orbit"]["id"]
-        id1 = a5["GCTRANSFORM_FIRST"]["orbit"]["id"]
-        h4.plot(a5["GCTRANSFORM_ZEROTH"]["orbit"]["r"][id0==i+1],
-                a5["GCTRANSFORM_ZEROTH"]["orbit"]["z"][id0==i+1], ccyc[4])
-        h4.plot(a5["GCTRANSFORM_FIRST"]["orbit"]["r"][id1==i+1],
-                a5["GCTRANSFORM_FIRST"]["orbit"]["z"][id1==i+1], ccyc[3])
-
-    h4.plot(a5["GCTRANSFORM_GO2GC"]["orbit"]["r"],
-            a5["GCTRANSFORM_GO2GC"]["orbit"]["z"], ccyc[1])
+    # Each orbit quantity is read only once and units are stripped here so
+    # that the rest is plain numpy
+    units = {"time" : "s", "mu" : "eV/T", "ppar" : "kg*m/s",
+             "r" : "m", "z" : "m"}
+    orb = {}
+    for test in ["GCTRANSFORM_GO", "GCTRANSFORM_GO2GC", "GCTRANSFORM_GC"]:
+        orbit = a5[test]["orbit"]
+        orb[test] = {k : orbit[k].to_value(u) for k, u in units.items()}
+    for test in ["GCTRANSFORM_ZEROTH", "GCTRANSFORM_FIRST"]:
+        orbit = a5[test]["orbit"]
+        orb[test] = {"id" : np.asarray(orbit["id"]),
+                     "r"  : orbit["r"].to_value("m"),
+                     "z"  : orbit["z"].to_value("m")}
+    go, go2gc, gc = (orb["GCTRANSFORM_GO"], orb["GCTRANSFORM_GO2GC"],
+                     orb["GCTRANSFORM_GC"])
+
+    h1.plot(go["time"]*1e6,    ( go["mu"]    - gc["mu"]      ) / 1e4 )
+    h1.plot(go2gc["time"]*1e6, ( go2gc["mu"] - gc["mu"][:-1] ) / 1e4 )
+
+    h2.plot(go["time"]*1e6,    ( go["ppar"]    - gc["ppar"]      ) / 1e-21 )
+    h2.plot(go2gc["time"]*1e6, ( go2gc["ppar"] - gc["ppar"][:-1] ) / 1e-21 )
+
+    h3.plot(go["r"],    go["z"])
+    h3.plot(go2gc["r"], go2gc["z"])
+    h3.plot(gc["r"],    gc["z"])
+
+    # Sort orbits by marker id so that each marker is a contiguous slice
+    for test, color in [("GCTRANSFORM_ZEROTH", ccyc[4]),
+                        ("GCTRANSFORM_FIRST",  ccyc[3])]:
+        ids   = orb[test]["id"]
+        order = np.argsort(ids, kind="stable")
+        rz    = np.column_stack((orb[test]["r"][order],
+                                 orb[test]["z"][order]))
+        idx   = np.searchsorted(ids[order], np.arange(1, nrep+2))
+        segs  = [rz[idx[i]:idx[i+1]] for i in range(0, nrep)]
+        h4.add_collection(LineCollection(segs, colors=color))
+
+    h4.plot(go2gc["r"], go2gc["z"], ccyc[1])
 
     #**************************************************************************#
     #*                 Finalize and print and show the figure                  #
@@ -447,46 +438,23 @@ def check():
     plt.show()
 
 if __name__ == '__main__':
-    if( len(sys.argv) == 1 ):
-        print("Initializing tests.")
-        init()
-        print("Initialization complete.")
-        print("")
-        print("Running tests.")
-        run()
-        print("Runs complete.")
-        print("")
-        print("Checking test results.")
-        check()
-        print("Testing complete.")
-        sys.exit()
-
-    if(len(sys.argv) > 2):
+    actions = {
+        "init"  : (init,  "Initializing tests.",    "Initialization complete."),
+        "run"   : (run,   "Running tests.",         "Runs complete."),
+        "check" : (check, "Checking test results.", "Testing complete."),
+    }
+
+    if( len(sys.argv) > 2 or
+        ( len(sys.argv) == 2 and sys.argv[1] not in actions ) ):
         print("Too many arguments.")
         print("Only \"init\", \"run\" or \"check\" is accepted.")
         print("Aborting.")
         sys.exit()
 
-    if( sys.argv[1] == "init" ):
-        print("Initializing tests.")
-        init()
-        print("Initialization complete.")
-        sys.exit()
-
-    elif( sys.argv[1] == "run" ):
-        print("Running tests.")
-        run()
-        print("Runs complete.")
-        sys.exit()
-
-    elif( sys.argv[1] == "check" ):
-        print("Checking test results.")
-        check()
-        print("Testing complete.")
-        sys.exit()
-
-    else:
-        print("Too many arguments.")
-        print("Only \"init\", \"run\" or \"check\" is accepted.")
-        print("Aborting.")
-        sys.exit()
+    for name in sys.argv[1:] or ["init", "run", "check"]:
+        fun, start, end = actions[name]
+        print(start)
+        fun()
+        print(end)
+        if len(sys.argv) == 1 and name != "check":
+            print("")
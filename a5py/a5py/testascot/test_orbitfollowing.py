@@ -21,15 +21,20 @@ verify that ASCOT5 is valid in relativistic regime.
 
 To init, run and check this test, call this script without any arguments. To
 do only one of the above, call this script with an argument "init", "run", or
-"check".
+"check". Use "numerics" to check the results without plotting. Add
+"--no-show" to save the figure without showing it, e.g. on a headless machine.
 
 File: test_orbitfollowing.py
 """
+import os
 import sys
 
+import h5py
 import numpy                   as np
 import matplotlib.pyplot       as plt
-import unyt
+import matplotlib.colors       as mcolors
+
+from matplotlib.collections import LineCollection
 
 import a5py.ascot5io.orbits    as orbits
 import a5py.ascot5io.options   as options
@@ -45,16 +50,21 @@ import a5py.ascot5io.asigma_loc as asigma_loc
 
 import a5py.testascot.helpers as helpers
 
+from a5py.ascot5io.coreio import fileapi
+
 from a5py.preprocessing.analyticequilibrium import psi0 as psifun
 
 from a5py.ascot5io.ascot5 import Ascot
-from a5py.physlib import e, m_e, c
+from a5py.physlib import m_e
 
 psi_mult  = 200
 R0        = 6.2
 z0        = 0
 Bphi0     = 5.3
 
+# Electron mass in amu as a plain float
+M_E_AMU   = float(m_e.to("amu").value)
+
 # ITER-like but circular equilibrium
 psi_coeff = np.array([ 2.218e-02, -1.288e-01, -4.177e-02, -6.227e-02,
                        6.200e-03, -1.205e-03, -3.701e-05,  0,
@@ -79,68 +89,41 @@ def init():
     """
 
     #**************************************************************************#
-    #*                     Generate options for ORBFOL-GO                      #
-    #*                                                                         #
-    #**************************************************************************#
-    odict = options.generateopt()
-    helpers.clean_opt(odict)
-
-    odict["SIM_MODE"]                  = 1
-    odict["FIXEDSTEP_USE_USERDEFINED"] = 1
-    odict["FIXEDSTEP_USERDEFINED"]     = 1e-11
-    odict["ENDCOND_SIMTIMELIM"]        = 1
-    odict["ENDCOND_LIM_SIMTIME"]       = 5e-6
-    odict["ENABLE_ORBIT_FOLLOWING"]    = 1
-    odict["ENABLE_ORBITWRITE"]         = 1
-    odict["ORBITWRITE_MODE"]           = 1
-    odict["ORBITWRITE_INTERVAL"]       = 1e-10
-    odict["ORBITWRITE_NPOINT"]         = 50002
-
-    options.write_hdf5(helpers.testfn, odict, desc="ORBFOL_GO")
-
-    #**************************************************************************#
-    #*                     Generate options for ORBFOL-GCF                     #
-    #*                                                                         #
-    #**************************************************************************#
-    odict = options.generateopt()
-    helpers.clean_opt(odict)
-
-    odict["SIM_MODE"]                  = 2
-    odict["FIXEDSTEP_USE_USERDEFINED"] = 1
-    odict["FIXEDSTEP_USERDEFINED"]     = 1e-10
-    odict["ENDCOND_SIMTIMELIM"]        = 1
-    odict["ENDCOND_LIM_SIMTIME"]       = 5e-6
-    odict["ENABLE_ORBIT_FOLLOWING"]    = 1
-    odict["ENABLE_ORBITWRITE"]         = 1
-    odict["ORBITWRITE_MODE"]           = 1
-    odict["ORBITWRITE_INTERVAL"]       = 1e-8
-    odict["ORBITWRITE_NPOINT"]         = 502
-
-    options.write_hdf5(helpers.testfn, odict, desc="ORBFOL_GCF")
-
-    #**************************************************************************#
-    #*                     Generate options for ORBFOL-GCA                     #
+    #*                 Generate options for each test case                     #
     #*                                                                         #
     #**************************************************************************#
-    odict = options.generateopt()
-    helpers.clean_opt(odict)
-
-    odict["SIM_MODE"]                  = 2
-    odict["ENABLE_ADAPTIVE"]           = 1
-    odict["ADAPTIVE_TOL_ORBIT"]        = 1e-10
-    odict["ADAPTIVE_MAX_DRHO"]         = 0.1
-    odict["ADAPTIVE_MAX_DPHI"]         = 10
-    odict["FIXEDSTEP_USE_USERDEFINED"] = 1
-    odict["FIXEDSTEP_USERDEFINED"]     = 1e-8
-    odict["ENDCOND_SIMTIMELIM"]        = 1
-    odict["ENDCOND_LIM_SIMTIME"]       = 5e-6
-    odict["ENABLE_ORBIT_FOLLOWING"]    = 1
-    odict["ENABLE_ORBITWRITE"]         = 1
-    odict["ORBITWRITE_MODE"]           = 1
-    odict["ORBITWRITE_INTERVAL"]       = 1e-8
-    odict["ORBITWRITE_NPOINT"]         = 502
-
-    options.write_hdf5(helpers.testfn, odict, desc="ORBFOL_GCA")
+    base = options.generateopt()
+    helpers.clean_opt(base)
+    base["FIXEDSTEP_USE_USERDEFINED"] = 1
+    base["ENDCOND_SIMTIMELIM"]        = 1
+    base["ENDCOND_LIM_SIMTIME"]       = 5e-6
+    base["ENABLE_ORBIT_FOLLOWING"]    = 1
+    base["ENABLE_ORBITWRITE"]         = 1
+    base["ORBITWRITE_MODE"]           = 1
+
+    overrides = {
+        "ORBFOL_GO" : {
+            "SIM_MODE"              : 1,
+            "FIXEDSTEP_USERDEFINED" : 1e-11,
+            "ORBITWRITE_INTERVAL"   : 1e-10,
+            "ORBITWRITE_NPOINT"     : 50002},
+        "ORBFOL_GCF" : {
+            "SIM_MODE"              : 2,
+            "FIXEDSTEP_USERDEFINED" : 1e-10,
+            "ORBITWRITE_INTERVAL"   : 1e-8,
+            "ORBITWRITE_NPOINT"     : 502},
+        "ORBFOL_GCA" : {
+            "SIM_MODE"              : 2,
+            "ENABLE_ADAPTIVE"       : 1,
+            "ADAPTIVE_TOL_ORBIT"    : 1e-10,
+            "ADAPTIVE_MAX_DRHO"     : 0.1,
+            "ADAPTIVE_MAX_DPHI"     : 10,
+            "FIXEDSTEP_USERDEFINED" : 1e-8,
+            "ORBITWRITE_INTERVAL"   : 1e-8,
+            "ORBITWRITE_NPOINT"     : 502},
+    }
+    for tname, odict in overrides.items():
+        options.write_hdf5(helpers.testfn, {**base, **odict}, desc=tname)
 
     #**************************************************************************#
     #*           Marker input consisting of an electron and positron           #
@@ -148,69 +131,62 @@ def init():
     #**************************************************************************#
     Nmrk   = 2
     ids    = np.array([1, 2])
-    weight = np.array([1, 1])
+    weight = np.full(Nmrk, 1.0)
     pitch  = np.array([0.4, 0.9])
-    mass   = m_e.to("amu") * np.array([1, 1])
-    charge = 1       * np.array([1,-1])
-    anum   = 1       * np.array([1, 0])
-    znum   = 1       * np.array([1, 0])
-    time   = 0       * np.array([1, 1])
-    R      = 7.6     * np.array([1, 1])
-    phi    = 90      * np.array([1, 1])
-    z      = 0       * np.array([1, 1])
-    zeta   = 2       * np.array([1, 1])
-    energy = 10e6    * np.array([1, 1])
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="ORBFOL_GO")
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="ORBFOL_GCF")
-    mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
-                   R, phi, z, energy, pitch, zeta,
-                   anum, znum, weight, time, desc="ORBFOL_GCA")
+    mass   = np.full(Nmrk, M_E_AMU)
+    charge = np.array([1.0, -1.0])
+    anum   = np.array([1.0,  0.0])
+    znum   = np.array([1.0,  0.0])
+    time   = np.full(Nmrk, 0.0)
+    R      = np.full(Nmrk, 7.6)
+    phi    = np.full(Nmrk, 90.0)
+    z      = np.full(Nmrk, 0.0)
+    zeta   = np.full(Nmrk, 2.0)
+    energy = np.full(Nmrk, 10e6)
+    for tname in ["ORBFOL_GO", "ORBFOL_GCF", "ORBFOL_GCA"]:
+        mrk.write_hdf5(helpers.testfn, Nmrk, ids, mass, charge,
+                       R, phi, z, energy, pitch, zeta,
+                       anum, znum, weight, time, desc=tname)
 
     #**************************************************************************#
     #*                     Construct ITER-like magnetic field                  #
     #*                                                                         #
     #**************************************************************************#
+    Rmin = 4; Rmax = 8.5; nR = 120; zmin = -4; zmax = 4; nz = 200;
     if use_spline:
-        B_GS.write_hdf5(helpers.testfn, R0, z0, Bphi0, psi_mult, psi_coeff,
-                        desc="ORBFOL_GO")
-        B_GS.write_hdf5(helpers.testfn, R0, z0, Bphi0, psi_mult, psi_coeff,
-                        desc="ORBFOL_GCF")
-        B_GS.write_hdf5(helpers.testfn, R0, z0, Bphi0, psi_mult, psi_coeff,
-                        desc="ORBFOL_GCA")
+        B_GS.write_hdf5(helpers.testfn, R0, z0, Bphi0, psi_mult,
+                        psi_coeff, desc="ORBFOL_GO")
     else:
-        Rmin = 4; Rmax = 8.5; nR = 120; zmin = -4; zmax = 4; nz = 200;
         B_GS.write_hdf5_B_2D(helpers.testfn, R0, z0, Bphi0, psi_mult,
                              psi_coeff, Rmin, Rmax, nR, zmin, zmax, nz,
                              desc="ORBFOL_GO")
-        B_GS.write_hdf5_B_2D(helpers.testfn, R0, z0, Bphi0, psi_mult,
-                             psi_coeff, Rmin, Rmax, nR, zmin, zmax, nz,
-                             desc="ORBFOL_GCF")
-        B_GS.write_hdf5_B_2D(helpers.testfn, R0, z0, Bphi0, psi_mult,
-                             psi_coeff, Rmin, Rmax, nR, zmin, zmax, nz,
-                             desc="ORBFOL_GCA")
 
     #**************************************************************************#
     #*                     Rest of the inputs are trivial                      #
     #*                                                                         #
     #**************************************************************************#
     Exyz   = np.array([0, 0, 0])
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="ORBFOL_GO")
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="ORBFOL_GCF")
-    E_TC.write_hdf5(helpers.testfn, Exyz, desc="ORBFOL_GCA")
-
     nwall = 4
     Rwall = np.array([0.1, 100, 100, 0.1])
     zwall = np.array([-100, -100, 100, 100])
-    for tname in ["ORBFOL_GO", "ORBFOL_GCF", "ORBFOL_GCA"]:
-        W_2D.write_hdf5(helpers.testfn, nwall, Rwall, zwall, desc=tname)
-        N0_3D.write_hdf5_dummy(helpers.testfn, desc=tname)
-        boozer.write_hdf5_dummy(helpers.testfn, desc=tname)
-        mhd.write_hdf5_dummy(helpers.testfn, desc=tname)
-        asigma_loc.write_hdf5_empty(helpers.testfn, desc=tname)
+    E_TC.write_hdf5(helpers.testfn, Exyz, desc="ORBFOL_GO")
+    W_2D.write_hdf5(helpers.testfn, nwall, Rwall, zwall, desc="ORBFOL_GO")
+    N0_3D.write_hdf5_dummy(helpers.testfn, desc="ORBFOL_GO")
+    boozer.write_hdf5_dummy(helpers.testfn, desc="ORBFOL_GO")
+    mhd.write_hdf5_dummy(helpers.testfn, desc="ORBFOL_GO")
+    asigma_loc.write_hdf5_empty(helpers.testfn, desc="ORBFOL_GO")
+
+    # These inputs (and the magnetic field) are identical in all tests so they
+    # are written only once and then copied for the other tests while the file
+    # is kept open
+    with h5py.File(helpers.testfn, "a") as h5:
+        for parent in ["bfield", "efield", "wall", "neutral", "boozer", "mhd",
+                       "asigma"]:
+            grp = [g for g in h5[parent].values()
+                   if fileapi.get_desc(h5, g) == "ORBFOL_GO"][0]
+            for tname in ["ORBFOL_GCF", "ORBFOL_GCA"]:
+                fileapi.set_desc(
+                    h5, fileapi.copy_group(h5, h5, grp, newgroup=True), tname)
 
     Nrho   = 3
     Nion   = 1
@@ -223,41 +199,123 @@ def init():
     etemp  = 1e3  * np.ones(rho.shape)
     idens  = 1e20 * np.ones((rho.size, Nion))
     itemp  = 1e3  * np.ones(rho.shape)
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="ORBFOL_GO")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="ORBFOL_GCF")
-    P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge, rho,
-                    edens, etemp, idens, itemp, desc="ORBFOL_GCA")
+    for tname in ["ORBFOL_GO", "ORBFOL_GCF", "ORBFOL_GCA"]:
+        P_1D.write_hdf5(helpers.testfn, Nrho, Nion, anum, znum, mass, charge,
+                        rho, edens, etemp, idens, itemp, desc=tname)
 
 
 def run():
     """
     Run tests.
     """
-    for test in ["ORBFOL_GO", "ORBFOL_GCF", "ORBFOL_GCA"]:
-        helpers.set_and_run(test)
+    helpers.run_parallel(["ORBFOL_GO", "ORBFOL_GCF", "ORBFOL_GCA"])
+    helpers.compress_orbits(["ORBFOL_GO", "ORBFOL_GCF", "ORBFOL_GCA"])
 
-def check():
+def check(plot=True, show=True):
     """
-    Plot the results of these tests.
+    Evaluate and plot the results of these tests.
 
-    This function makes four plots.
+    The maximum relative errors of the conserved quantities are printed for
+    each case. If plot is True, this function also makes four plots.
     - One that shows conservation of energy for all cases
     - One that shows conservation of magnetic moment for all cases
     - One that shows conservation of toroidal canonical momentum for all cases
     - And one that shows trajectories on a Rz plane for all cases
+
+    Args:
+        plot: bool Plot the results in addition to evaluating the errors
+        show: bool Show the figure in addition to saving it
+    """
+    errs = _compute_errors()
+    for case in ["GO", "GCF", "GCA"]:
+        print(case + ": " + ", ".join(
+            "max |d" + qnt + "/" + qnt + "0| = " + "{:.3e}".format(val)
+            for qnt, val in errs[case]["maxerr"].items()))
+    if plot:
+        _plot_errors(errs, show)
+
+def _compute_errors(cache="test_orbitfollowing.cache.npz"):
     """
-    a5 = Ascot(helpers.testfn)
+    Read the test results and evaluate relative errors of conserved quantities.
+
+    The data is sorted by marker id and time, so that each marker is a
+    contiguous slice of the sorted arrays. The relative error is evaluated
+    with respect to the initial value of each marker.
+
+    The evaluated data is stored in a cache file which is used instead of the
+    test file as long as the modification time and size of the test file
+    match those recorded in the cache.
+
+    Args:
+        cache: str Name of the cache file or None to not use a cache
+
+    Returns:
+        Dictionary with an entry for each case containing time, r, z, the
+        indices where the data of each subsequent marker begins ("split"), the
+        relative errors of ekin, mu and ctor, and their maximum absolute
+        values ("maxerr").
+    """
+    cases = ["GO", "GCF", "GCA"]
+    qnts  = ["time", "r", "z", "split", "ekin", "mu", "ctor"]
+    stat  = os.stat(helpers.testfn)
+    key   = "{}-{}".format(stat.st_mtime_ns, stat.st_size)
+
+    errs = None
+    if cache is not None and os.path.isfile(cache):
+        with np.load(cache) as data:
+            if data["key"] == key:
+                errs = {case : {qnt : data[case + "_" + qnt] for qnt in qnts}
+                        for case in cases}
+
+    if errs is None:
+        a5   = Ascot(helpers.testfn)
+        errs = {}
+        for case in cases:
+            orb   = a5["ORBFOL_" + case]["orbit"]
+            data  = {qnt : np.asarray(orb[qnt]) for qnt in
+                     ["time", "id", "r", "z", "ekin", "mu", "ctor"]}
+            order = np.lexsort((data["time"], data["id"]))
+            data  = {qnt : val[order] for qnt, val in data.items()}
+            # Index of the first (t=0) sample of each marker and the index of
+            # the marker each sample belongs to
+            _, start, inverse = np.unique(data["id"], return_index=True,
+                                          return_inverse=True)
+
+            errs[case] = {"time" : data["time"], "r" : data["r"],
+                          "z" : data["z"], "split" : start[1:]}
+            for qnt in ["ekin", "mu", "ctor"]:
+                rel  = data[qnt] / data[qnt][start][inverse]
+                rel -= 1
+                errs[case][qnt] = rel
+
+        if cache is not None:
+            np.savez(cache, key=key, **{case + "_" + qnt : errs[case][qnt]
+                                        for case in cases for qnt in qnts})
+
+    for case in cases:
+        errs[case]["maxerr"] = {qnt : np.max(np.abs(errs[case][qnt]))
+                                for qnt in ["ekin", "mu", "ctor"]}
+
+    return errs
+
+@plt.rc_context({"xtick.labelsize" : 10, "ytick.labelsize" : 10,
+                 "axes.labelsize" : 10, "mathtext.fontset" : "stix",
+                 "font.family" : "STIXGeneral"})
+def _plot_errors(errs, show=True):
+    """
+    Plot the relative errors and trajectories evaluated by _compute_errors.
+
+    Args:
+        errs: dict Output of _compute_errors
+        show: bool Show the figure in addition to saving it
+    """
+    # The figure is only saved, so no GUI backend is needed
+    if not show:
+        plt.switch_backend("Agg")
 
     raxis = R0
 
     f = plt.figure(figsize=(11.9/2.54, 8/2.54))
-    plt.rc('xtick', labelsize=10)
-    plt.rc('ytick', labelsize=10)
-    plt.rc('axes', labelsize=10)
-    plt.rcParams['mathtext.fontset'] = 'stix'
-    plt.rcParams['font.family'] = 'STIXGeneral'
 
     h1 = f.add_subplot(1,4,1)
     h1.set_position([0.12, 0.72, 0.4, 0.25], which='both')
@@ -271,110 +329,30 @@ def check():
     h4 = f.add_subplot(1,4,4)
     h4.set_position([0.6, 0.3, 0.45, 0.45], which='both')
 
-    colors = ["C0", "C9", "C2", "C8", "C3", "C1"]
-
-    #**************************************************************************#
-    #*     Evaluate and plot conservation quantities for ORBFOL_GO             #
-    #*                                                                         #
-    #**************************************************************************#
-    ORBFOL = {}
-    ORBFOL["GO"] = {}
-    orb = a5["ORBFOL_GO"]["orbit"]
-
-    ORBFOL["GO"]["time"] = orb["time"]
-    ORBFOL["GO"]["id"]   = orb["id"]
-    ORBFOL["GO"]["r"]    = orb["r"]
-    ORBFOL["GO"]["z"]    = orb["z"]
-    ORBFOL["GO"]["ekin"] = orb["ekin"]
-    ORBFOL["GO"]["mu"]   = orb["mu"]
-    ORBFOL["GO"]["ctor"] = orb["ctor"]
-
-    id1 = ORBFOL["GO"]["id"] == 1
-    id2 = ORBFOL["GO"]["id"] == 2
-    plot_relerr(h1, ORBFOL["GO"]["time"][id1], ORBFOL["GO"]["ekin"][id1],
-                colors[0])
-    plot_relerr(h1, ORBFOL["GO"]["time"][id2], ORBFOL["GO"]["ekin"][id2],
-                colors[1])
-    plot_relerr(h2, ORBFOL["GO"]["time"][id2], ORBFOL["GO"]["mu"][id2],
-                colors[0])
-    plot_relerr(h2, ORBFOL["GO"]["time"][id1], ORBFOL["GO"]["mu"][id1],
-                colors[1])
-    plot_relerr(h3, ORBFOL["GO"]["time"][id1], ORBFOL["GO"]["ctor"][id1],
-                colors[0])
-    plot_relerr(h3, ORBFOL["GO"]["time"][id2], ORBFOL["GO"]["ctor"][id2],
-                colors[1])
-    h4.plot(        ORBFOL["GO"]["r"][id1],    ORBFOL["GO"]["z"][id1],
-                    colors[0], alpha=0.7)
-    h4.plot(        ORBFOL["GO"]["r"][id2],    ORBFOL["GO"]["z"][id2],
-                    colors[1], alpha=0.7)
-
-    #**************************************************************************#
-    #*     Evaluate and plot conservation quantities for ORBFOL_GCF            #
-    #*                                                                         #
-    #**************************************************************************#
-    ORBFOL["GCF"] = {}
-    orb = a5["ORBFOL_GCF"]["orbit"]
-
-    ORBFOL["GCF"]["time"] = orb["time"]
-    ORBFOL["GCF"]["id"]   = orb["id"]
-    ORBFOL["GCF"]["r"]    = orb["r"]
-    ORBFOL["GCF"]["z"]    = orb["z"]
-    ORBFOL["GCF"]["ekin"] = orb["ekin"]
-    ORBFOL["GCF"]["mu"]   = orb["mu"]
-    ORBFOL["GCF"]["ctor"] = orb["ctor"]
-
-    id1 = ORBFOL["GCF"]["id"] == 1
-    id2 = ORBFOL["GCF"]["id"] == 2
-    plot_relerr(h1, ORBFOL["GCF"]["time"][id1], ORBFOL["GCF"]["ekin"][id1],
-                colors[2])
-    plot_relerr(h1, ORBFOL["GCF"]["time"][id2], ORBFOL["GCF"]["ekin"][id2],
-                colors[3])
-    plot_relerr(h2, ORBFOL["GCF"]["time"][id1], ORBFOL["GCF"]["mu"][id1],
-                colors[2])
-    plot_relerr(h2, ORBFOL["GCF"]["time"][id2], ORBFOL["GCF"]["mu"][id2],
-                colors[3])
-    plot_relerr(h3, ORBFOL["GCF"]["time"][id1], ORBFOL["GCF"]["ctor"][id1],
-                colors[2])
-    plot_relerr(h3, ORBFOL["GCF"]["time"][id2], ORBFOL["GCF"]["ctor"][id2],
-                colors[3])
-    h4.plot(        ORBFOL["GCF"]["r"][id1],    ORBFOL["GCF"]["z"][id1],
-                colors[2], alpha=0.7, linewidth=1)
-    h4.plot(        ORBFOL["GCF"]["r"][id2],    ORBFOL["GCF"]["z"][id2],
-                colors[3], alpha=0.7, linewidth=1)
+    # Colors are converted to RGBA once and passed as arrays to collections
+    colors = mcolors.to_rgba_array(["C0", "C9", "C2", "C8", "C3", "C1"])
 
     #**************************************************************************#
-    #*     Evaluate and plot conservation quantities for ORBFOL_GCA            #
+    #*        Evaluate and plot conservation quantities for each case          #
     #*                                                                         #
     #**************************************************************************#
-    ORBFOL["GCA"] = {}
-    orb = a5["ORBFOL_GCA"]["orbit"]
-
-    ORBFOL["GCA"]["time"] = orb["time"]
-    ORBFOL["GCA"]["id"]   = orb["id"]
-    ORBFOL["GCA"]["r"]    = orb["r"]
-    ORBFOL["GCA"]["z"]    = orb["z"]
-    ORBFOL["GCA"]["ekin"] = orb["ekin"]
-    ORBFOL["GCA"]["mu"]   = orb["mu"]
-    ORBFOL["GCA"]["ctor"] = orb["ctor"]
-
-    id1 = ORBFOL["GCA"]["id"] == 1
-    id2 = ORBFOL["GCA"]["id"] == 2
-    plot_relerr(h1, ORBFOL["GCA"]["time"][id1], ORBFOL["GCA"]["ekin"][id1],
-                colors[4])
-    plot_relerr(h1, ORBFOL["GCA"]["time"][id2], ORBFOL["GCA"]["ekin"][id2],
-                colors[5])
-    plot_relerr(h2, ORBFOL["GCA"]["time"][id1], ORBFOL["GCA"]["mu"][id1],
-                colors[4])
-    plot_relerr(h2, ORBFOL["GCA"]["time"][id2], ORBFOL["GCA"]["mu"][id2],
-                colors[5])
-    plot_relerr(h3, ORBFOL["GCA"]["time"][id1], ORBFOL["GCA"]["ctor"][id1],
-                colors[4])
-    plot_relerr(h3, ORBFOL["GCA"]["time"][id2], ORBFOL["GCA"]["ctor"][id2],
-                colors[5])
-    h4.plot(        ORBFOL["GCA"]["r"][id1],    ORBFOL["GCA"]["z"][id1],
-                    colors[4], alpha=0.7, linewidth=1)
-    h4.plot(        ORBFOL["GCA"]["r"][id2],    ORBFOL["GCA"]["z"][id2],
-                colors[5], alpha=0.7, linewidth=1)
+    # Trajectories of all cases are collected and drawn as a single collection
+    segs, widths = [], []
+    lw0 = plt.rcParams["lines.linewidth"]
+    for case, color, lw in [("GO",  colors[0:2], lw0),
+                            ("GCF", colors[2:4], 1),
+                            ("GCA", colors[4:6], 1)]:
+        split = errs[case]["split"]
+        time  = errs[case]["time"]
+        plot_relerr(h1, time, errs[case]["ekin"], split, color)
+        plot_relerr(h2, time, errs[case]["mu"],   split, color)
+        plot_relerr(h3, time, errs[case]["ctor"], split, color)
+        rz    = np.column_stack((errs[case]["r"], errs[case]["z"]))
+        segs += [rzi[::max(1, len(rzi)//4000)] for rzi in np.split(rz, split)]
+        widths += [lw, lw]
+    h4.add_collection(LineCollection(segs, colors=colors, alpha=0.7,
+                                     linewidths=widths, rasterized=True))
+    h4.autoscale_view()
 
     #**************************************************************************#
     #*                 Finalize and print and show the figure                  #
@@ -432,13 +410,37 @@ def check():
     h4.text(7.0, 2.0, legend[5], fontsize=9, color=colors[4])
 
     plt.savefig("test_orbitfollowing.png", dpi=300)
-    plt.show()
+    if show:
+        plt.show()
 
-def plot_relerr(axis, x, y, color):
-    axis.plot(x, y/y[0] - 1, color, alpha=0.7)
+def plot_relerr(axis, x, rel, split, colors, npoint=2000):
+    """
+    Plot relative error with respect to the initial value for each marker.
+
+    The data is sorted by marker so that the curve of each marker is a
+    contiguous slice, and the curves are drawn as a single line collection.
+    Long curves are thinned to roughly npoint points as the plot cannot
+    resolve more.
+
+    Args:
+        axis:   Axes where the curves are plotted
+        x:      array_like x-coordinates sorted by marker
+        rel:    array_like Relative error sorted by marker
+        split:  array_like Indices where the data of the next marker begins
+        colors: array_like RGBA color of each curve
+        npoint: int Approximate number of points plotted per curve
+    """
+    xy    = np.column_stack((x, rel))
+    lines = [xyi[::max(1, len(xyi)//npoint)] for xyi in np.split(xy, split)]
+    axis.add_collection(LineCollection(lines, colors=colors, alpha=0.7))
+    axis.autoscale_view()
 
 
 if __name__ == '__main__':
+    show = "--no-show" not in sys.argv
+    if not show:
+        sys.argv.remove("--no-show")
+
     if( len(sys.argv) == 1 ):
         print("Initializing tests.")
         init()
@@ -449,13 +451,13 @@ if __name__ == '__main__':
         print("Runs complete.")
         print("")
         print("Checking test results.")
-        check()
+        check(show=show)
         print("Testing complete.")
         sys.exit()
 
     if(len(sys.argv) > 2):
         print("Too many arguments.")
-        print("Only \"init\", \"run\" or \"check\" is accepted.")
+        print("Only \"init\", \"run\", \"check\" or \"numerics\" is accepted.")
         print("Aborting.")
         sys.exit()
 
@@ -473,12 +475,18 @@ if __name__ == '__main__':
 
     elif( sys.argv[1] == "check" ):
         print("Checking test results.")
-        check()
+        check(show=show)
+        print("Testing complete.")
+        sys.exit()
+
+    elif( sys.argv[1] == "numerics" ):
+        print("Checking test results without plotting.")
+        check(plot=False)
         print("Testing complete.")
         sys.exit()
 
     else:
         print("Too many arguments.")
-        print("Only \"init\", \"run\" or \"check\" is accepted.")
+        print("Only \"init\", \"run\", \"check\" or \"numerics\" is accepted.")
         print("Aborting.")
         sys.exit()
@@ -304,6 +304,13 @@ class TestAscot5IO(unittest.TestCase):
                 msg="Failed to raise exception when endcond unknown"):
             State.endcond_check(0x2 | 0x4, "vanished")
 
+        state = State(None, "results/run_0000000000/endstate")
+        for ec in ["NONE", "ABORTED", "TLIM", "EMIN", "THERM", "WALL",
+                   "RHOMIN", "RHOMAX", "POLMAX", "TORMAX", "CPUMAX", "NEUTR",
+                   "IONIZ"]:
+            self.assertEqual(getattr(state, ec), getattr(State, "_" + ec),
+                             "Endcond property does not match its value.")
+
     def test_inputs(self):
         inputs = {
             "bfield"  : ["B_TC", "B_GS", "B_2DS", "B_3DS", "B_3DST", "B_STS",],
@@ -12,6 +12,9 @@
 #include "../ascot5.h"
 #include "../print.h"
 
+/** @brief Maximum size of a single chunk in extendible datasets in bytes */
+#define HDF5_MAX_CHUNK_BYTES 33554432
+
 /**
  * @brief Initialize hdf5, right now just disables automatic error messages.
  */
@@ -289,6 +292,24 @@ herr_t hdf5_write_string_attribute(hid_t loc, const char* path,
     return 0;
 }
 
+/**
+ * @brief Chunk length for an extendible dataset.
+ *
+ * The data is split in two chunks, but a chunk is at most
+ * HDF5_MAX_CHUNK_BYTES in size so that large datasets (e.g. long orbits) are
+ * not stored as a few huge chunks which would not fit in the chunk cache when
+ * the data is read. The chunk length is at least one, as HDF5 does not accept
+ * zero-sized chunks.
+ */
+static hsize_t hdf5_extendible_chunk_length(int length, size_t typesize) {
+    hsize_t chunk = (hsize_t)ceil(length/2.0);
+    hsize_t max   = HDF5_MAX_CHUNK_BYTES / typesize;
+    if(chunk > max) {
+        chunk = max;
+    }
+    return chunk > 0 ? chunk : 1;
+}
+
 /**
  * @brief Create and write to an extendible dataset for double data.
  */
@@ -301,7 +322,8 @@ herr_t hdf5_write_extendible_dataset_double(hid_t group,
     hid_t dataspace   = H5Screate_simple(1, dim, maxdim);
 
     /* Modify dataset creation properties, i.e. enable chunking  */
-    hsize_t chunk_dim[1] = {(int)ceil(length/2.0)};
+    hsize_t chunk_dim[1] = {hdf5_extendible_chunk_length(
+        length, sizeof(double))};
     hid_t prop   = H5Pcreate(H5P_DATASET_CREATE);
     H5Pset_chunk (prop, 1, chunk_dim);
 
@@ -335,7 +357,8 @@ herr_t hdf5_write_extendible_dataset_long(hid_t group,
     hid_t dataspace   = H5Screate_simple(1, dim, maxdim);
 
     /* Modify dataset creation properties, i.e. enable chunking  */
-    hsize_t chunk_dim[1] = {(int)ceil(length/2.0)};
+    hsize_t chunk_dim[1] = {hdf5_extendible_chunk_length(
+        length, sizeof(long))};
     hid_t prop   = H5Pcreate(H5P_DATASET_CREATE);
     H5Pset_chunk (prop, 1, chunk_dim);
 
@@ -368,7 +391,8 @@ herr_t hdf5_write_extendible_dataset_int(hid_t group,
     hid_t dataspace   = H5Screate_simple(1, dim, maxdim);
 
     /* Modify dataset creation properties, i.e. enable chunking  */
-    hsize_t chunk_dim[1] = {(int)ceil(length/2.0)};
+    hsize_t chunk_dim[1] = {hdf5_extendible_chunk_length(
+        length, sizeof(int))};
     hid_t prop   = H5Pcreate(H5P_DATASET_CREATE);
     H5Pset_chunk (prop, 1, chunk_dim);
 